@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# --- Answer Cache Configuration ---
+CACHE_DIR = "cache"
+ANSWER_CACHE_FILE = "answer_cache.json"
+ANSWER_CACHE_VERSION = 1
+GREETING_CACHE_FILE = "greetings.json"
+SIMILARITY_THRESHOLD = 0.85
+MAX_ENTRIES = 256
+ENTRY_TTL = 7 * 24 * 3600
+EMBEDDING_DIM = 1024
+
+# Questions mentioning these have answers that go stale within the TTL; they are never cached.
+TIME_SENSITIVE_WORDS = {
+    "time", "today", "todays", "tonight", "tomorrow", "yesterday", "now", "date", "current", "currently",
+    "latest", "weather", "this week", "this month", "this year",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "to", "of", "in", "on", "at",
+    "for", "and", "or", "me", "my", "i", "you", "your", "can", "could", "please", "tell", "about", "what",
+    "whats", "which", "there", "any", "it", "this", "that", "with", "how", "hey", "hi", "hello", "know",
+    "want", "details", "information", "info",
+}
+
+
+def normalize_query(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def is_time_sensitive(text):
+    """True if the question depends on when it is asked, e.g. "what time is it" or "today's events"."""
+    normalized = normalize_query(text)
+    words = set(normalized.split())
+    return any(phrase in words if " " not in phrase else f" {phrase} " in f" {normalized} " for phrase in TIME_SENSITIVE_WORDS)
+
+
+def _bucket(feature, dim):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little") % dim
+
+
+def embed_text(text, dim=EMBEDDING_DIM):
+    """Local, dependency-free sentence embedding: hashed word unigrams/bigrams plus character trigrams.
+
+    Good enough to match rephrasings of the same short question ("bus routes?" vs
+    "which bus routes are there"); returns an L2-normalized float32 vector.
+    """
+    words = [word for word in normalize_query(text).split() if word not in STOPWORDS]
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in words:
+        vector[_bucket("w:" + word, dim)] += 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            vector[_bucket("c:" + padded[i:i + 3], dim)] += 0.3
+    for first, second in zip(words, words[1:]):
+        vector[_bucket(f"b:{first} {second}", dim)] += 0.7
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def context_fingerprint(*parts):
+    """Hash of everything that shapes an answer (prompt, context, model); any change invalidates the cache."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Persistent semantic cache of (question -> answer text, emotion tag).
+
+    A new question hits when its embedding's cosine similarity to a stored question
+    is at least ``threshold``. Entries are evicted least-recently-used beyond
+    ``max_entries`` and expire after ``ttl`` seconds. Time-sensitive questions
+    ("what time is it", "today's events") are neither looked up nor stored. The whole cache is discarded when
+    ``fingerprint`` (prompt + college context) no longer matches the stored one.
+    """
+
+    def __init__(self, fingerprint, path=os.path.join(CACHE_DIR, ANSWER_CACHE_FILE), threshold=SIMILARITY_THRESHOLD,
+                 max_entries=MAX_ENTRIES, ttl=ENTRY_TTL, log=print):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.log = log
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._vectors = {}
+        self.stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.log(f"⚠️ Warning: Answer cache unreadable, starting empty. Error: {e}")
+            return
+        if data.get("version") != ANSWER_CACHE_VERSION or data.get("fingerprint") != self.fingerprint:
+            self.log("Answer cache invalidated: prompt or college context changed.")
+            return
+        now = time.time()
+        for entry in data.get("entries", []):
+            if now - entry["created"] <= self.ttl:
+                self._entries[entry["key"]] = entry
+                self._vectors[entry["key"]] = embed_text(entry["question"])
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": ANSWER_CACHE_VERSION, "fingerprint": self.fingerprint,
+                       "entries": list(self._entries.values())}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, question):
+        """Returns the cached entry dict (answer, emotion, similarity, ...) or None."""
+        if is_time_sensitive(question):
+            return None
+        key = normalize_query(question)
+        vector = embed_text(question)
+        now = time.time()
+        with self._lock:
+            expired = [k for k, entry in self._entries.items() if now - entry["created"] > self.ttl]
+            for k in expired:
+                del self._entries[k]
+                del self._vectors[k]
+
+            best_key, best_similarity = None, 0.0
+            if key in self._entries:
+                best_key, best_similarity = key, 1.0
+            elif self._vectors:
+                keys = list(self._vectors)
+                similarities = np.stack([self._vectors[k] for k in keys]) @ vector
+                best = int(np.argmax(similarities))
+                best_key, best_similarity = keys[best], float(similarities[best])
+
+            if best_key is None or best_similarity < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            entry["hits"] = entry.get("hits", 0) + 1
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += entry.get("latency", 0.0)
+            return dict(entry, similarity=best_similarity)
+
+    def store(self, question, answer, emotion, latency=0.0):
+        key = normalize_query(question)
+        if not key or not answer or is_time_sensitive(question):
+            return
+        with self._lock:
+            self._entries[key] = {"key": key, "question": question, "answer": answer, "emotion": emotion,
+                                  "latency": latency, "created": time.time(), "hits": 0}
+            self._entries.move_to_end(key)
+            self._vectors[key] = embed_text(question)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._vectors[evicted]
+            try:
+                self._save()
+            except OSError as e:
+                self.log(f"⚠️ Warning: Could not save answer cache. Error: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class GreetingStore:
+    """Persistent exact-name cache of generated greetings, kept apart from visitor answers.
+
+    Names are looked up exactly (no semantic matching, which could greet one person
+    with another's greeting). Shares the answer cache's TTL and fingerprint rules.
+    """
+
+    def __init__(self, fingerprint, path=os.path.join(CACHE_DIR, GREETING_CACHE_FILE), ttl=ENTRY_TTL, log=print):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.ttl = ttl
+        self.log = log
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") == self.fingerprint:
+                self._entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.log(f"⚠️ Warning: Greeting cache unreadable, starting empty. Error: {e}")
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry and time.time() - entry["created"] <= self.ttl:
+            return entry["text"]
+        return None
+
+    def put(self, name, text):
+        with self._lock:
+            self._entries[name] = {"text": text, "created": time.time()}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"fingerprint": self.fingerprint, "entries": self._entries}, f, indent=1)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self.log(f"⚠️ Warning: Could not save greeting cache. Error: {e}")
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+# --- Asset Cache Configuration ---
+ASSET_DIR = os.path.join("cache", "assets")
+ASSET_MAX_AGE = 7 * 24 * 3600  # Older downloads are still shown, then refreshed in the background
+DOWNLOAD_TIMEOUT = 10.0
+
+
+def asset_path(url, asset_dir=ASSET_DIR):
+    """On-disk location of a downloaded asset: a hash of the URL plus the original extension."""
+    extension = os.path.splitext(url.split("?")[0])[1] or ".bin"
+    return os.path.join(asset_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + extension)
+
+
+def cached_image(url, asset_dir=ASSET_DIR, max_age=ASSET_MAX_AGE):
+    """Returns (image, fresh) for a previously downloaded image, or (None, False) if there is none."""
+    path = asset_path(url, asset_dir)
+    try:
+        with Image.open(path) as image:
+            image.load()
+        return image, time.time() - os.path.getmtime(path) < max_age
+    except (OSError, ValueError):
+        return None, False
+
+
+def fetch_image(url, asset_dir=ASSET_DIR, timeout=DOWNLOAD_TIMEOUT):
+    """Downloads an image into the asset cache and returns it."""
+    import requests
+
+    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+    response.raise_for_status()
+    path = asset_path(url, asset_dir)
+    os.makedirs(asset_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    with Image.open(tmp_path) as image:
+        image.load()  # Rejects anything that isn't a readable image before it replaces the cached copy.
+    os.replace(tmp_path, path)
+    return image
+
+
+def fallback_logo(size, text, background, foreground):
+    """Draws a plain text badge, shown when the real logo has never been downloaded."""
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle((0, 0, size[0] - 1, size[1] - 1), radius=min(size) // 8, fill=background)
+    try:
+        font = ImageFont.load_default(size=min(size) // 4)
+    except TypeError:
+        font = ImageFont.load_default()  # Pillow < 10.1 has only the fixed-size bitmap font.
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text(((size[0] - (right - left)) / 2 - left, (size[1] - (bottom - top)) / 2 - top), text, font=font, fill=foreground)
+    return image
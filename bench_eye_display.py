@@ -0,0 +1,125 @@
+"""Benchmark: latency from an emotion tag to the eye display receiving it.
+
+Runs the local EyeAnimationServer stand-in and measures, for each emotion update,
+the time from EyeDisplayClient.update() to the frame arriving at the display. The
+persistent client is compared with opening a new connection per message, and a
+slow-display run shows how bursts are coalesced to the latest state.
+
+    python bench_eye_display.py --messages 200 --render-delay 0.02
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+
+from dialogue_stream import EMOTION_TAGS
+from eye_display import EyeAnimationServer, EyeDisplayClient, encode_message
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {}
+    values = np.array(samples) * 1000
+    return {"p50": round(float(np.percentile(values, 50)), 3), "p95": round(float(np.percentile(values, 95)), 3),
+            "max": round(float(values.max()), 3)}
+
+
+class Recorder:
+    """Collects receive times keyed by message sequence number."""
+
+    def __init__(self):
+        self.received = {}
+        self.last = None
+        self.event = threading.Event()
+
+    def __call__(self, message, received_at):
+        self.received[message["seq"]] = received_at
+        self.last = message
+        self.event.set()
+
+
+def bench_persistent(messages, interval):
+    recorder = Recorder()
+    server = EyeAnimationServer(port=0, on_message=recorder, log=lambda message: None).start()
+    client = EyeDisplayClient(*server.address, log=lambda message: None).start()
+    while not client.connected:
+        time.sleep(0.01)
+
+    sent_at = {}
+    for i in range(messages):
+        recorder.event.clear()
+        sent_at[client.update(state="SPEAKING", emotion=EMOTION_TAGS[i % len(EMOTION_TAGS)])] = time.time()
+        recorder.event.wait(1.0)
+        time.sleep(interval)
+    client.stop()
+    server.stop()
+    return [recorder.received[seq] - sent_at[seq] for seq in sent_at if seq in recorder.received]
+
+
+def bench_connect_per_message(messages, interval):
+    recorder = Recorder()
+    server = EyeAnimationServer(port=0, on_message=recorder, log=lambda message: None).start()
+    sent_at = {}
+    for seq in range(1, messages + 1):
+        recorder.event.clear()
+        sent_at[seq] = time.time()
+        with socket.create_connection(server.address) as sock:
+            sock.sendall(encode_message({"seq": seq, "state": "SPEAKING", "emotion": EMOTION_TAGS[seq % len(EMOTION_TAGS)]}))
+        recorder.event.wait(1.0)
+        time.sleep(interval)
+    server.stop()
+    return [recorder.received[seq] - sent_at[seq] for seq in sent_at if seq in recorder.received]
+
+
+def bench_slow_display(messages, render_delay):
+    """Bursts updates at a display that takes render_delay per frame; reports how stale the final state is."""
+    recorder = Recorder()
+    server = EyeAnimationServer(port=0, on_message=recorder, render_delay=render_delay, log=lambda message: None).start()
+    client = EyeDisplayClient(*server.address, log=lambda message: None).start()
+    while not client.connected:
+        time.sleep(0.01)
+
+    last_seq = None
+    for i in range(messages):
+        last_seq = client.update(state="SPEAKING", emotion=EMOTION_TAGS[i % len(EMOTION_TAGS)])
+        time.sleep(0.001)
+    final_sent = time.time()
+    deadline = time.time() + 5
+    while last_seq not in recorder.received and time.time() < deadline:
+        time.sleep(0.001)
+    client.stop()
+    server.stop()
+    return {"updates": messages, "frames_sent": client.stats["sent"], "coalesced": client.stats["coalesced"],
+            "final_state_delay_ms": round((recorder.received.get(last_seq, float("nan")) - final_sent) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between updates")
+    parser.add_argument("--render-delay", type=float, default=0.02, help="simulated display time per frame")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = {
+        "persistent": percentiles_ms(bench_persistent(args.messages, args.interval)),
+        "connect_per_message": percentiles_ms(bench_connect_per_message(args.messages, args.interval)),
+        "slow_display": bench_slow_display(args.messages, args.render_delay),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'mode':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for mode in ("persistent", "connect_per_message"):
+        stats = report[mode]
+        print(f"{mode:<22} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['max']:>8.3f}")
+    slow = report["slow_display"]
+    print(f"Slow display ({args.render_delay * 1000:.0f} ms/frame): {slow['updates']} updates -> {slow['frames_sent']} frames "
+          f"({slow['coalesced']} coalesced), final state shown after {slow['final_state_delay_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
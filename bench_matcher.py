@@ -0,0 +1,70 @@
+"""Microbenchmark: per-frame face matching cost against gallery size.
+
+Compares the old per-face compare_faces + face_distance loop (reproduced with numpy
+so face_recognition is not required) with FaceMatcher's batched and coarse-to-fine
+modes on synthetic galleries.
+
+    python bench_matcher.py --faces 3 --sizes 100 1000 10000 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face_matcher import FaceMatcher
+
+
+def legacy_match(known_face_encodings, face_encodings, known_face_names, tolerance=0.6):
+    names = []
+    for face_encoding in face_encodings:
+        # compare_faces and face_distance each rebuild and scan the whole gallery.
+        matches = list(np.linalg.norm(np.array(known_face_encodings) - face_encoding, axis=1) <= tolerance)
+        face_distances = np.linalg.norm(np.array(known_face_encodings) - face_encoding, axis=1)
+        best_match_index = np.argmin(face_distances)
+        names.append(known_face_names[best_match_index] if matches[best_match_index] else "Person")
+    return names
+
+
+def synthetic_gallery(size, per_person, rng):
+    people = max(1, size // per_person)
+    centers = rng.normal(0, 0.12, size=(people, 128)).astype(np.float32)
+    labels = np.arange(size) % people
+    encodings = centers[labels] + rng.normal(0, 0.03, size=(size, 128)).astype(np.float32)
+    return encodings, [f"person{label}" for label in labels], centers
+
+
+def time_per_call(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--faces", type=int, default=2, help="faces per frame")
+    parser.add_argument("--per-person", type=int, default=10, help="enrolled samples per identity")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'gallery':>8} {'legacy ms':>10} {'batched ms':>11} {'coarse ms':>10} {'agree':>6}")
+    for size in args.sizes:
+        encodings, names, centers = synthetic_gallery(size, args.per_person, rng)
+        faces = centers[rng.integers(0, len(centers), args.faces)] + rng.normal(0, 0.03, size=(args.faces, 128)).astype(np.float32)
+        known_list = list(encodings)
+
+        batched = FaceMatcher(encodings, names, coarse_to_fine=False)
+        coarse = FaceMatcher(encodings, names, coarse_to_fine=True)
+
+        legacy_ms = time_per_call(lambda: legacy_match(known_list, faces, names), max(1, args.repeats // 4))
+        batched_ms = time_per_call(lambda: batched.identify(faces), args.repeats)
+        coarse_ms = time_per_call(lambda: coarse.identify(faces), args.repeats)
+        agree = [m.name for m in batched.identify(faces)] == [m.name for m in coarse.identify(faces)]
+        print(f"{size:>8} {legacy_ms:>10.3f} {batched_ms:>11.3f} {coarse_ms:>10.3f} {str(agree):>6}")
+
+
+if __name__ == "__main__":
+    main()
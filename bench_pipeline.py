@@ -0,0 +1,267 @@
+"""Headless replay benchmark for the vision + dialogue pipeline.
+
+Feeds a recorded video, a directory of images, or a synthetic stream built from
+the known_faces/ photos through detection, recognition and emotion. In parallel it
+replays scripted visitor queries through the app's dialogue scheduler, with
+retrieval, the answer cache, a fake streaming LLM, a null TTS and a null player. Reports per-stage p50/p95/p99 latency, sustained FPS,
+CPU use and peak memory as JSON, so runs can be compared whenever the pipeline changes.
+
+    python bench_pipeline.py --synthetic --frames 300 --output bench.json
+    python bench_pipeline.py --video visitors.mp4
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from answer_cache import AnswerCache, context_fingerprint
+from context_retrieval import ContextRetriever
+from dialogue_scheduler import AppState, DialogueScheduler, LLMClient
+from dialogue_stream import FakeStreamingModel, SpeechQueue
+from emotion_service import EmotionService
+from eval_retrieval import EVAL_QUESTIONS
+from face_gallery import IMAGE_EXTENSIONS, KNOWN_FACES_DIR, load_known_faces, scan_known_faces
+from face_matcher import FaceMatcher
+from prompts import COLLEGE_CONTEXT, GEMINI_PROMPT
+from vision_pipeline import FaceAnalyzer
+
+FRAME_SIZE = (640, 480)
+FAKE_REPLY = "TIST offers B.Tech, M.Tech and MBA programs. Admissions follow KEAM and KMAT rules. Can I help with anything else?\nHAPPY"
+
+
+def latency_stats(samples):
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds."""
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples) * 1000
+    return {"count": len(samples), "mean": round(float(values.mean()), 3),
+            **{f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)}}
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 2 ** 20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def bench_cache_dir(known_faces_dir):
+    """Per-directory face cache outside the app's face_cache/, reused across benchmark runs."""
+    digest = hashlib.sha1(os.path.abspath(known_faces_dir).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), "bench_face_cache", digest)
+
+
+def fit_to_canvas(image, size=FRAME_SIZE, offset=(0, 0)):
+    """Letterboxes an image into a size[0] x size[1] black frame, shifted by offset pixels."""
+    width, height = size
+    scale = min(width / image.shape[1], height / image.shape[0])
+    resized = cv2.resize(image, (int(image.shape[1] * scale), int(image.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    x0 = min(max(0, (width - resized.shape[1]) // 2 + offset[0]), width - resized.shape[1])
+    y0 = min(max(0, (height - resized.shape[0]) // 2 + offset[1]), height - resized.shape[0])
+    canvas[y0:y0 + resized.shape[0], x0:x0 + resized.shape[1]] = resized
+    return canvas
+
+
+def video_frames(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            ret, image = cap.read()
+            if not ret:
+                return
+            yield image
+    finally:
+        cap.release()
+
+
+def image_frames(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(directory, name))
+            if image is not None:
+                yield fit_to_canvas(image)
+
+
+def synthetic_frames(known_faces_dir, hold=30, gap=5, drift=12):
+    """Simulates visitors from the enrollment photos.
+
+    Each photo stays in view for ``hold`` frames, swaying by up to ``drift`` pixels so
+    the tracker has motion to follow, followed by ``gap`` empty frames so tracks end.
+    """
+    blank = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    for relative_path, _, _ in scan_known_faces(known_faces_dir):
+        image = cv2.imread(os.path.join(known_faces_dir, relative_path))
+        if image is None:
+            continue
+        for i in range(hold):
+            yield fit_to_canvas(image, offset=(int(drift * math.sin(i / 4)), int(drift / 2 * math.cos(i / 5))))
+        for _ in range(gap):
+            yield blank
+
+
+def run_vision(frames, analyzer, max_frames, warmup):
+    stages = {"detect": [], "encode": [], "match": [], "emotion": [], "frame": []}
+    names, processed, measured_wall = set(), 0, 0.0
+    for image in frames:
+        if max_frames and processed >= max_frames:
+            break
+        start = time.perf_counter()
+        faces, _ = analyzer.analyze(image)
+        elapsed = time.perf_counter() - start
+        processed += 1
+        names.update(face.name for face in faces)
+        if processed <= warmup:
+            continue
+        measured_wall += elapsed
+        stages["frame"].append(elapsed)
+        for stage, seconds in analyzer.stage_times.items():
+            stages[stage].append(seconds)
+    measured = len(stages["frame"])
+    return {
+        "frames": processed,
+        "measured_frames": measured,
+        "sustained_fps": round(measured / measured_wall, 2) if measured_wall else None,
+        "stages_ms": {stage: latency_stats(samples) for stage, samples in stages.items()},
+        "identities_seen": sorted(names),
+        "scheduler": dict(analyzer.scheduler.stats, final_scale=analyzer.scheduler.scale),
+        "emotion_service": analyzer.emotion_service.snapshot(),
+    }
+
+
+class NullPlayer:
+    """Stands in for AudioPlayer: nothing is ever queued, so it is always idle."""
+
+    def play(self, path, **tags):
+        pass
+
+    def stop(self):
+        pass
+
+    def wait(self, timeout=None):
+        return True
+
+
+def timed(function, samples):
+    """Wraps function so the duration of every call is appended to samples."""
+    def call(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return call
+
+
+def run_dialogue(queries, llm_delay, chunk_delay, rounds):
+    stages = {"cache_lookup": [], "retrieval": [], "first_audio": [], "reply": []}
+    quiet = lambda message: None
+    retriever = ContextRetriever(COLLEGE_CONTEXT)
+    llm = LLMClient(model=FakeStreamingModel(FAKE_REPLY, first_chunk_delay=llm_delay, chunk_delay=chunk_delay), log=quiet)
+    speech = SpeechQueue(lambda sentence: None, log=quiet)  # Null TTS
+    turn_over = threading.Event()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = AnswerCache(context_fingerprint(GEMINI_PROMPT, COLLEGE_CONTEXT),
+                            path=os.path.join(cache_dir, "answers.json"), log=quiet)
+        cache.lookup = timed(cache.lookup, stages["cache_lookup"])
+        # Text turns settle back in LISTENING once the reply has been spoken.
+        scheduler = DialogueScheduler(llm, speech, NullPlayer(), cache, timed(retriever.build_prompt, stages["retrieval"]),
+                                      on_state=lambda state: state == AppState.LISTENING and turn_over.set(), log=quiet).start()
+        try:
+            for _ in range(rounds):
+                for query in queries:
+                    turn_over.clear()
+                    turn_start = time.perf_counter()
+                    if scheduler.submit(query) != "queued":
+                        continue
+                    turn_over.wait()
+                    stages["reply"].append(time.perf_counter() - turn_start)
+                    if speech.time_to_first_audio is not None:
+                        stages["first_audio"].append(speech.time_to_first_audio)
+        finally:
+            scheduler.stop()
+        cache_stats = cache.snapshot()
+    return {"queries": len(queries) * rounds, "stages_ms": {stage: latency_stats(samples) for stage, samples in stages.items()},
+            "answer_cache_hit_rate": cache_stats["hit_rate"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="recorded video file to replay")
+    source.add_argument("--images", help="directory of images, one frame each")
+    source.add_argument("--synthetic", action="store_true", help="build a stream from the known_faces photos (default)")
+    parser.add_argument("--known-faces", default=KNOWN_FACES_DIR)
+    parser.add_argument("--face-cache", help="face encoding cache dir (default: a per-directory temp dir, never the app's)")
+    parser.add_argument("--frames", type=int, default=0, help="stop after this many frames (0 = whole source)")
+    parser.add_argument("--warmup", type=int, default=5, help="initial frames left out of the statistics")
+    parser.add_argument("--hold", type=int, default=30, help="synthetic: frames each photo stays in view")
+    parser.add_argument("--llm-delay", type=float, default=0.4, help="fake LLM time to first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.03, help="fake LLM gap between streamed chunks")
+    parser.add_argument("--query-rounds", type=int, default=1, help="times the scripted queries are replayed")
+    parser.add_argument("--no-dialogue", action="store_true", help="benchmark vision only")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.video:
+        frames, source_name = video_frames(args.video), args.video
+    elif args.images:
+        frames, source_name = image_frames(args.images), args.images
+    else:
+        frames, source_name = synthetic_frames(args.known_faces, hold=args.hold), f"synthetic:{args.known_faces}"
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    encodings, names = load_known_faces(args.known_faces, args.face_cache or bench_cache_dir(args.known_faces),
+                                        log=lambda message: None)
+    enroll_seconds = time.perf_counter() - wall_start
+    analyzer = FaceAnalyzer(matcher=FaceMatcher(encodings, names), emotion_service=EmotionService(log=lambda message: None))
+
+    # Dialogue replays alongside vision, contending for the CPU as it does in the app.
+    dialogue = {}
+    dialogue_thread = None
+    if not args.no_dialogue:
+        queries = [question for question, _ in EVAL_QUESTIONS]
+        dialogue_thread = threading.Thread(
+            target=lambda: dialogue.update(run_dialogue(queries, args.llm_delay, args.chunk_delay, args.query_rounds)),
+            daemon=True)
+        dialogue_thread.start()
+    vision = run_vision(frames, analyzer, args.frames, args.warmup)
+    if dialogue_thread:
+        dialogue_thread.join()
+
+    wall = time.perf_counter() - wall_start
+    report = {
+        "source": source_name,
+        "gallery_size": len(names),
+        "enroll_seconds": round(enroll_seconds, 3),
+        "vision": vision,
+        "dialogue": dialogue or None,
+        "wall_seconds": round(wall, 3),
+        "cpu_percent": round((time.process_time() - cpu_start) / wall * 100, 1),
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import itertools
+import threading
+from collections import namedtuple
+
+from check_cameras import PROBE_INDICES, PROBE_TIMEOUT, probe_cameras
+from detection_scheduler import DetectionScheduler
+from emotion_service import EmotionService
+from face_matcher import FaceMatcher
+from face_tracker import FaceTracker
+from greeting_prefetch import NON_IDENTITIES
+from vision_pipeline import CAMERA_INDEX, CaptureThread, FaceAnalyzer, InferenceWorker, LatestFrameBuffer
+
+Visitor = namedtuple("Visitor", ["name", "camera", "track_id", "distance", "emotion", "cameras"])
+
+
+class CameraStream:
+    """One camera's frame buffer, capture thread, analyzer and inference worker."""
+
+    def __init__(self, camera_index, analyzer, on_result, log=print):
+        self.camera_index = camera_index
+        self.analyzer = analyzer
+        self.buffer = LatestFrameBuffer()
+        self.capture = CaptureThread(self.buffer, camera_index, log=log)
+        self.worker = InferenceWorker(self.buffer, analyzer, on_result=on_result, log=log, camera_index=camera_index)
+
+    def start(self):
+        self.capture.start()
+        self.worker.start()
+
+    def stop(self):
+        self.worker.stop()
+        self.capture.stop()
+
+    @property
+    def latest_result(self):
+        return self.worker.latest_result
+
+
+class PresenceView:
+    """Merges the faces seen by every camera into one view of who is present.
+
+    A known identity seen by several cameras is one visitor, represented by a
+    single primary (camera, track) that stays the same while that track is visible.
+    Unidentified faces cannot be matched across cameras and are listed per track.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._faces = {}
+        self._primary = {}
+
+    def update(self, camera, faces):
+        with self._lock:
+            self._faces[camera] = list(faces)
+            self._refresh_primaries()
+
+    def remove(self, camera):
+        with self._lock:
+            self._faces.pop(camera, None)
+            self._refresh_primaries()
+
+    def _refresh_primaries(self):
+        present = {(camera, face.track_id): face for camera, faces in self._faces.items() for face in faces}
+        primary = {name: key for name, key in self._primary.items() if key in present and present[key].name == name}
+        by_distance = sorted(present.items(), key=lambda item: item[1].distance if item[1].distance is not None else float("inf"))
+        for key, face in by_distance:
+            if face.name not in NON_IDENTITIES and face.name not in primary:
+                primary[face.name] = key
+        self._primary = primary
+
+    def is_primary(self, camera, face):
+        """True if this face represents its identity (always true for unidentified faces)."""
+        with self._lock:
+            return face.name in NON_IDENTITIES or self._primary.get(face.name) == (camera, face.track_id)
+
+    @property
+    def present(self):
+        with self._lock:
+            return any(self._faces.values())
+
+    def visitors(self):
+        with self._lock:
+            faces = {(camera, face.track_id): face for camera, faces in self._faces.items() for face in faces}
+            primary = dict(self._primary)
+        seen_by = {}
+        for (camera, _), face in faces.items():
+            seen_by.setdefault(face.name, set()).add(camera)
+        visitors = [Visitor(name, camera, track_id, faces[camera, track_id].distance, faces[camera, track_id].emotion,
+                            tuple(sorted(seen_by[name]))) for name, (camera, track_id) in primary.items()]
+        visitors += [Visitor(face.name, camera, track_id, face.distance, face.emotion, (camera,))
+                     for (camera, track_id), face in faces.items() if face.name in NON_IDENTITIES]
+        return visitors
+
+
+class CameraManager:
+    """Discovers cameras and runs a capture + inference worker pair per camera.
+
+    Every stream gets its own tracker and detection scheduler; the face matcher and
+    emotion service are shared, and track ids come from one counter so they are
+    unique across cameras. Results update the merged ``presence`` view before being
+    passed on to ``on_result``.
+    """
+
+    def __init__(self, matcher=None, emotion_service=None, on_result=None, on_streams_changed=None, log=print):
+        self.matcher = matcher or FaceMatcher([], [])
+        self.emotion_service = emotion_service or EmotionService(log=log)
+        self.on_result = on_result
+        self.on_streams_changed = on_streams_changed
+        self.log = log
+        self.presence = PresenceView()
+        self.streams = {}
+        self._enrolling = False
+        self._track_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def discover(self, indices=PROBE_INDICES, timeout=PROBE_TIMEOUT):
+        """Probes camera indices in parallel and returns the ones that deliver frames."""
+        found = [info for info in probe_cameras(indices, timeout) if info.available]
+        for info in found:
+            self.log(f"📷 Camera {info.index}: {info.width}x{info.height} @ {info.fps:.0f} fps")
+        return [info.index for info in found]
+
+    def start(self, indices=None):
+        """Opens the given camera indices, or discovers cameras in the background when indices is None."""
+        if indices is not None:
+            self.open(indices)
+            return
+
+        def discover_and_open():
+            found = self.discover()
+            if not found:
+                self.log(f"❌ No cameras found; waiting for camera {CAMERA_INDEX}.")
+            self.open(found or [CAMERA_INDEX])
+
+        threading.Thread(target=discover_and_open, daemon=True, name="camera-discovery").start()
+
+    def open(self, indices):
+        for index in indices:
+            with self._lock:
+                if index in self.streams:
+                    continue
+                analyzer = FaceAnalyzer(self.matcher, FaceTracker(ids=self._track_ids), self.emotion_service, DetectionScheduler())
+                analyzer.enrolling = self._enrolling
+                stream = CameraStream(index, analyzer, self._handle_result, log=self.log)
+                self.streams[index] = stream
+            stream.start()
+        if self.on_streams_changed:
+            self.on_streams_changed(self.indices)
+
+    def stop(self):
+        with self._lock:
+            streams, self.streams = list(self.streams.values()), {}
+        for stream in streams:
+            stream.stop()
+            self.presence.remove(stream.camera_index)
+
+    def _handle_result(self, result):
+        self.presence.update(result.camera, result.faces)
+        if self.on_result:
+            self.on_result(result)
+
+    @property
+    def indices(self):
+        with self._lock:
+            return sorted(self.streams)
+
+    def stream(self, index):
+        with self._lock:
+            return self.streams.get(index)
+
+    def set_matcher(self, matcher):
+        """Swaps the gallery matcher on every stream; tracks are re-identified against it."""
+        self.matcher = matcher
+        with self._lock:
+            for stream in self.streams.values():
+                stream.analyzer.matcher = matcher
+
+    @property
+    def enrolling(self):
+        return self._enrolling
+
+    @enrolling.setter
+    def enrolling(self, value):
+        self._enrolling = value
+        with self._lock:
+            for stream in self.streams.values():
+                stream.analyzer.enrolling = value
+
+    @property
+    def active_track_ids(self):
+        with self._lock:
+            analyzers = [stream.analyzer for stream in self.streams.values()]
+        return set().union(*(analyzer.tracker.active_track_ids for analyzer in analyzers))
+
+    def dropped_frames(self):
+        with self._lock:
+            return {index: stream.buffer.dropped for index, stream in self.streams.items()}
@@ -1,16 +1,63 @@
+import threading
+import time
+from collections import namedtuple
+
 import cv2
 
+# --- Camera Probing Configuration ---
+PROBE_INDICES = range(5)
+PROBE_TIMEOUT = 3.0  # Seconds before a device that hangs while opening is reported unavailable
+
+CameraInfo = namedtuple("CameraInfo", ["index", "available", "width", "height", "fps"])
+
+
+def probe_camera(index):
+    """Opens one camera index, grabs a frame and reports what it delivers."""
+    cap = cv2.VideoCapture(index)
+    try:
+        if cap is None or not cap.isOpened():
+            return CameraInfo(index, False, 0, 0, 0.0)
+        ret, frame = cap.read()
+        if not ret:
+            return CameraInfo(index, False, 0, 0, 0.0)
+        height, width = frame.shape[:2]
+        return CameraInfo(index, True, width, height, float(cap.get(cv2.CAP_PROP_FPS) or 0.0))
+    finally:
+        if cap is not None:
+            cap.release()
+
+
+def probe_cameras(indices=PROBE_INDICES, timeout=PROBE_TIMEOUT):
+    """Probes camera indices in parallel and returns a CameraInfo per index, in index order.
+
+    Each probe runs on its own daemon thread; a device that has not answered within
+    ``timeout`` seconds is reported unavailable instead of stalling the search.
+    """
+    results = {}
+
+    def probe(index):
+        try:
+            results[index] = probe_camera(index)
+        except Exception:
+            results[index] = CameraInfo(index, False, 0, 0, 0.0)
+
+    threads = [threading.Thread(target=probe, args=(index,), daemon=True, name=f"probe-{index}") for index in indices]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return [results.get(index, CameraInfo(index, False, 0, 0, 0.0)) for index in indices]
+
+
 def find_cameras():
     """Tests camera indices 0 through 4 to see which are available."""
     print("Searching for available cameras...")
-    for i in range(5):
-        print(f"--- Checking index {i} ---")
-        cap = cv2.VideoCapture(i)
-        if cap is not None and cap.isOpened():
-            print(f"✅ SUCCESS: Camera found at index {i}")
-            cap.release()
+    for info in probe_cameras():
+        if info.available:
+            print(f"✅ SUCCESS: Camera found at index {info.index} ({info.width}x{info.height} @ {info.fps:.0f} fps)")
         else:
-            print(f"❌ FAILURE: No camera at index {i}")
+            print(f"❌ FAILURE: No camera at index {info.index}")
     print("Search complete.")
 
 if __name__ == "__main__":
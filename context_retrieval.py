@@ -0,0 +1,140 @@
+import math
+import re
+from collections import Counter, namedtuple
+
+from answer_cache import STOPWORDS
+
+# --- Retrieval Configuration ---
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOP_K = 3
+TOKEN_BUDGET = 350
+MIN_SCORE = 0.5  # Queries scoring below this against every section get no college context
+# Words that name the institution in general; with the name from the knowledge title they pull in the overview.
+INSTITUTION_WORDS = ("college", "institute", "institution")
+OVERVIEW_TITLE = "Overview"
+
+STEM_SUFFIXES = ("ations", "ation", "ions", "ion", "ings", "ing", "ed", "es", "s")
+# Visitor wording -> the wording used in the knowledge text.
+QUERY_SYNONYMS = {
+    "join": "admission", "apply": "admission", "enroll": "admission", "enrol": "admission",
+    "bus": "transportation", "buses": "transportation", "call": "phone", "contact": "phone",
+    "where": "location", "course": "program", "branch": "program", "recruit": "placement",
+}
+
+Section = namedtuple("Section", ["title", "text"])
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for budgeting prompts."""
+    return (len(text) + 3) // 4
+
+
+def stem(word):
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text, expand=False):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    terms = [stem(word) for word in words if word not in STOPWORDS]
+    if expand:
+        terms += [stem(QUERY_SYNONYMS[word]) for word in words if word in QUERY_SYNONYMS]
+    return terms
+
+
+def split_sections(markdown):
+    """Splits knowledge text on its ``##`` headings. Text before the first heading is folded into every title."""
+    preamble, sections = "", []
+    title, lines = None, []
+    for line in markdown.strip().splitlines():
+        if line.startswith("## "):
+            if title is not None:
+                sections.append(Section(title, "\n".join(lines).strip()))
+            title, lines = line[3:].strip(), []
+        elif title is None:
+            preamble = line.lstrip("# ").strip() or preamble
+        else:
+            lines.append(line)
+    if title is not None:
+        sections.append(Section(title, "\n".join(lines).strip()))
+    if preamble:
+        sections = [Section(f"{preamble}: {section.title}", section.text) for section in sections]
+    return sections
+
+
+def document_title(markdown):
+    """The knowledge text's ``#`` title without any " - ..." subtitle, e.g. the institution's name."""
+    for line in markdown.strip().splitlines():
+        if line.startswith("# "):
+            return line[2:].split(" - ")[0].strip()
+    return ""
+
+
+class ContextRetriever:
+    """BM25 index over knowledge sections, returning the best ones under a token budget.
+
+    The institution's name is folded into every section title, so it scores too low
+    to select anything on its own. Queries that name the institution and either
+    match no section or ask about nothing else ("Tell me about TIST") get the
+    overview section first.
+    """
+
+    def __init__(self, knowledge, top_k=TOP_K, token_budget=TOKEN_BUDGET, min_score=MIN_SCORE):
+        self.sections = split_sections(knowledge)
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.min_score = min_score
+        self._docs = [Counter(tokenize(f"{section.title}\n{section.text}")) for section in self.sections]
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        document_frequency = Counter(term for doc in self._docs for term in doc)
+        n = len(self._docs)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+        self._institution_terms = set(tokenize(document_title(knowledge))) | {stem(word) for word in INSTITUTION_WORDS}
+        self._overview = next((section for section in self.sections if section.title.endswith(OVERVIEW_TITLE)),
+                              self.sections[0] if self.sections else None)
+
+    def scores(self, query):
+        terms = tokenize(query, expand=True)
+        results = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_length)
+                    score += self._idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+    def retrieve(self, query):
+        """Returns up to top_k relevant sections, best first, whose combined size fits the budget."""
+        ranked = sorted(zip(self.scores(query), range(len(self.sections))), reverse=True)
+        candidates = [self.sections[index] for score, index in ranked[:self.top_k] if score >= self.min_score]
+        terms = set(tokenize(query))
+        if self._overview is not None and terms & self._institution_terms and (
+                not candidates or terms <= self._institution_terms):
+            candidates = ([self._overview] + [section for section in candidates if section is not self._overview])[:self.top_k]
+        selected, used = [], 0
+        for section in candidates:
+            cost = estimate_tokens(self.format_section(section))
+            if used + cost > self.token_budget:
+                continue
+            selected.append(section)
+            used += cost
+        return selected
+
+    @staticmethod
+    def format_section(section):
+        return f"## {section.title}\n{section.text}"
+
+    def build_prompt(self, query):
+        """Per-query prompt: retrieved college context (if any) followed by the user's query."""
+        sections = self.retrieve(query)
+        if not sections:
+            return f"User Query: \"{query}\""
+        context = "\n\n".join(self.format_section(section) for section in sections)
+        return f"College information:\n{context}\n\nUser Query: \"{query}\""
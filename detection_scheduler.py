@@ -0,0 +1,97 @@
+import cv2
+
+from face_tracker import box_iou
+
+# --- Detection Scheduling Configuration ---
+FULL_SCAN_INTERVAL = 15  # Frames between full-frame scans while faces are being tracked
+ROI_MARGIN = 0.6  # ROI grows by this fraction of the face size on every side
+ROI_SCALE = 1.0  # ROIs are searched at native resolution
+DETECTION_SCALES = (0.25, 0.35, 0.5, 0.75, 1.0)
+INITIAL_SCALE = 0.5
+TARGET_FPS = 10.0
+BUDGET_EMA_ALPHA = 0.2
+SCALE_COOLDOWN_FRAMES = 10
+DUPLICATE_IOU = 0.5
+
+
+class DetectionScheduler:
+    """Decides where and at what resolution to run face detection on each frame.
+
+    A full-frame scan runs when nothing is tracked or every ``full_scan_interval``
+    frames; otherwise only margin-expanded ROIs around the tracked faces are searched,
+    at ``roi_scale``. The full-scan resolution steps down through ``scales`` while the
+    measured frame time is over budget (1 / target_fps) and back up when there is
+    headroom. Boxes are (top, right, bottom, left) in full-frame coordinates.
+    """
+
+    def __init__(self, full_scan_interval=FULL_SCAN_INTERVAL, roi_margin=ROI_MARGIN, roi_scale=ROI_SCALE,
+                 scales=DETECTION_SCALES, initial_scale=INITIAL_SCALE, target_fps=TARGET_FPS):
+        self.full_scan_interval = full_scan_interval
+        self.roi_margin = roi_margin
+        self.roi_scale = roi_scale
+        self.scales = sorted(scales)
+        self.scale_index = self.scales.index(initial_scale) if initial_scale in self.scales else len(self.scales) // 2
+        self.target_fps = target_fps
+        self.frame_time = None
+        self._frames_since_full = 0
+        self._cooldown = 0
+        self.stats = {"full_scans": 0, "roi_scans": 0, "scale_changes": 0}
+
+    @property
+    def scale(self):
+        return self.scales[self.scale_index]
+
+    def plan(self, frame_shape, tracked_boxes):
+        """Returns [(x0, y0, x1, y1, scale), ...] regions to search in this frame."""
+        height, width = frame_shape[:2]
+        if not tracked_boxes or self._frames_since_full >= self.full_scan_interval:
+            self._frames_since_full = 0
+            self.stats["full_scans"] += 1
+            return [(0, 0, width, height, self.scale)]
+
+        self._frames_since_full += 1
+        self.stats["roi_scans"] += 1
+        regions = []
+        for top, right, bottom, left in tracked_boxes:
+            pad_x, pad_y = (right - left) * self.roi_margin, (bottom - top) * self.roi_margin
+            regions.append((max(0, int(left - pad_x)), max(0, int(top - pad_y)),
+                            min(width, int(right + pad_x)), min(height, int(bottom + pad_y)), self.roi_scale))
+        return regions
+
+    def detect(self, frame_rgb, tracked_boxes, locate):
+        """Runs ``locate(image) -> [(top, right, bottom, left)]`` over the planned regions.
+
+        Returns de-duplicated boxes in full-frame coordinates.
+        """
+        boxes = []
+        for x0, y0, x1, y1, scale in self.plan(frame_rgb.shape, tracked_boxes):
+            region = frame_rgb[y0:y1, x0:x1]
+            if region.size == 0:
+                continue
+            if scale != 1.0:
+                region = cv2.resize(region, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            for top, right, bottom, left in locate(region):
+                box = (int(top / scale) + y0, int(right / scale) + x0, int(bottom / scale) + y0, int(left / scale) + x0)
+                if all(box_iou(box, other) < DUPLICATE_IOU for other in boxes):
+                    boxes.append(box)
+        return boxes
+
+    def record_frame_time(self, seconds):
+        """Feeds back one frame's processing time and adapts the full-scan resolution."""
+        if self.frame_time is None:
+            self.frame_time = seconds
+        else:
+            self.frame_time = BUDGET_EMA_ALPHA * seconds + (1 - BUDGET_EMA_ALPHA) * self.frame_time
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return
+
+        budget = 1.0 / self.target_fps
+        if self.frame_time > budget * 1.1 and self.scale_index > 0:
+            self.scale_index -= 1
+        elif self.frame_time < budget * 0.6 and self.scale_index < len(self.scales) - 1:
+            self.scale_index += 1
+        else:
+            return
+        self.stats["scale_changes"] += 1
+        self._cooldown = SCALE_COOLDOWN_FRAMES
@@ -0,0 +1,504 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import Future
+from enum import Enum
+
+import metrics
+from answer_cache import normalize_query
+from dialogue_stream import DEFAULT_EMOTION, SentenceChunker, looks_like_echo, split_emotion_tag
+
+# --- Dialogue Scheduling Configuration ---
+MAX_QUEUED_TURNS = 3
+CACHE_LOOKUP_TIMEOUT = 1.0  # A slow answer-cache lookup counts as a miss
+LLM_POOL_SIZE = 2
+LLM_BACKGROUND_SLOTS = 1  # Pool slots speculative work (greeting prefetch) may hold, so a query always finds one free
+LLM_FIRST_TOKEN_TIMEOUT = 10.0
+LLM_CHUNK_TIMEOUT = 10.0
+LLM_TIMEOUT = 30.0
+LLM_RETRIES = 2
+LLM_BACKOFF = 0.5  # Seconds before the first retry; doubles on every further retry
+SPEECH_TIMEOUT = 60.0  # Longest a reply may keep talking before it is cut off
+NO_VISITOR_TIMEOUT = 5.0  # Listening with no visitor in view falls back to idle after this long
+
+
+class AppState(Enum):
+    IDLE = 1
+    LISTENING = 2
+    THINKING = 3
+    SPEAKING = 4
+
+
+TurnRequest = namedtuple("TurnRequest", ["request_id", "kind", "query", "key", "source", "track_ids", "payload"])
+
+
+class LLMClient:
+    """One long-lived model client shared by every turn, with a small worker pool.
+
+    The model object (and the HTTP/gRPC transport it keeps open) is created once and
+    reused, and ``warm()`` primes that connection at startup so the first visitor
+    does not pay for it. Given a ``factory`` instead of a model, the model (and the
+    SDK import behind it) is created on first use on a worker thread. At most
+    ``pool_size`` blocking SDK calls run at once, each on a daemon thread and with the
+    SDK's own request timeout, so a hung call ends and frees its slot and never
+    holds up interpreter exit. ``astream()`` also bounds the wait for the first token,
+    between chunks and overall. Background calls (``generate(..., background=True)``)
+    share at most ``background_slots`` of the pool.
+    """
+
+    def __init__(self, model=None, factory=None, pool_size=LLM_POOL_SIZE, first_token_timeout=LLM_FIRST_TOKEN_TIMEOUT,
+                 chunk_timeout=LLM_CHUNK_TIMEOUT, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, backoff=LLM_BACKOFF,
+                 background_slots=LLM_BACKGROUND_SLOTS, log=print):
+        self._model = model
+        self._factory = factory
+        self._model_lock = threading.Lock()
+        self.first_token_timeout = first_token_timeout
+        self.chunk_timeout = chunk_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.log = log
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._background_slots = threading.BoundedSemaphore(min(background_slots, pool_size))
+        self._call_ids = itertools.count(1)
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._factory()
+            return self._model
+
+    def warm(self):
+        """Creates the model and opens its connection in the background with a cheap token-count request.
+
+        Returns a future that completes (never with an error) once warm-up is over.
+        """
+        def ping():
+            start = time.perf_counter()
+            try:
+                self.model.count_tokens("Hello")
+                self.log(f"🔌 LLM connection warmed in {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                self.log(f"⚠️ LLM warm-up failed: {e}")
+        return self._submit(ping)
+
+    def _submit(self, call, background=False):
+        """Runs call on a daemon thread once a slot is free; returns a concurrent.futures.Future."""
+        future = Future()
+
+        def run():
+            with self._background_slots if background else nullcontext(), self._slots:
+                if not future.set_running_or_notify_cancel():
+                    return  # Abandoned while waiting for a slot.
+                try:
+                    future.set_result(call())
+                except BaseException as e:
+                    future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True, name=f"llm-{next(self._call_ids)}").start()
+        return future
+
+    def _generate_text(self, prompt):
+        return self.model.generate_content(prompt, request_options={"timeout": self.timeout}).text
+
+    def generate(self, prompt, background=False):
+        """Blocking one-shot generation with timeout and retry/backoff; returns the reply text.
+
+        ``background`` marks speculative work, which is limited to the background slots.
+        """
+        for attempt in range(self.retries + 1):
+            future = self._submit(lambda: self._generate_text(prompt), background)
+            try:
+                return future.result(self.timeout)
+            except Exception as e:
+                future.cancel()  # Never runs if it timed out still waiting for a slot.
+                if attempt == self.retries:
+                    raise
+                metrics.count("llm_retries")
+                self.log(f"⚠️ LLM call failed ({str(e) or type(e).__name__}); retrying.")
+                time.sleep(self.backoff * 2 ** attempt)
+
+    async def agenerate(self, prompt):
+        return await asyncio.wait_for(asyncio.wrap_future(self._submit(lambda: self._generate_text(prompt))), self.timeout)
+
+    async def astream(self, prompt):
+        """Yields the reply's text chunks as they arrive. Raises asyncio.TimeoutError when the model stalls."""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                pass  # The loop has shut down.
+
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True, request_options={"timeout": self.timeout}):
+                    if stop.is_set():
+                        return
+                    put(("chunk", chunk.text or ""))
+                put(("done", None))
+            except Exception as e:
+                put(("error", e))
+
+        self._submit(produce)
+        deadline = loop.time() + self.timeout
+        first = True
+        try:
+            while True:
+                wait = min(self.first_token_timeout if first else self.chunk_timeout, deadline - loop.time())
+                if wait <= 0:
+                    raise asyncio.TimeoutError()
+                kind, value = await asyncio.wait_for(chunks.get(), wait)
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                first = False
+                yield value
+        finally:
+            stop.set()  # Lets the producer thread drop the rest of an abandoned stream.
+
+
+class DialogueScheduler:
+    """Owns the assistant's state machine and runs every turn on one asyncio loop.
+
+    Voice (``hear()``) and text (``submit()``) requests go into a bounded queue and
+    are answered one at a time; the queue rejects new requests when full and an
+    identical query that is already queued or running is not queued twice. A turn
+    looks up the answer cache, then streams the LLM reply sentence by sentence into
+    the speech queue, with timeouts on each stage and retry/backoff for the LLM
+    while nothing has been spoken yet. Turns are cancelled on barge-in and when every
+    visitor track they were asked for has disappeared.
+
+    All public methods are thread-safe; callbacks run on the scheduler's thread.
+    """
+
+    def __init__(self, llm, speech, player, answer_cache, build_prompt, stream=True, max_queued=MAX_QUEUED_TURNS,
+                 on_state=None, on_query=None, on_sentence=None, on_reply=None, on_error=None, log=print):
+        self.llm = llm
+        self.speech = speech
+        self.player = player
+        self.answer_cache = answer_cache
+        self.build_prompt = build_prompt
+        self.stream = stream
+        self.max_queued = max_queued
+        self.on_state = on_state or (lambda state: None)
+        self.on_query = on_query or (lambda query: None)
+        self.on_sentence = on_sentence or (lambda text_so_far: None)
+        self.on_reply = on_reply or (lambda text, emotion, cached: None)
+        self.on_error = on_error or (lambda message: None)
+        self.log = log
+        self.state = AppState.IDLE
+        self.turn_id = 0
+        self.spoken_sentences = []
+        self._lock = threading.Lock()
+        self._keys = {}  # Query key -> request_id of the queued or running request, for dedup
+        self._running = None  # Request of the running turn, readable from any thread under _lock
+        self._pending = 0  # Queued or running requests, for backpressure
+        self._request_ids = itertools.count(1)
+        self._present = False
+        self._check_echo = False  # Set when speech cut a reply short, until that utterance's transcript arrives
+        self._current = None  # (request, task) of the running turn
+        self._cancelled = {}  # request_id -> state to settle in once the cancelled turn unwinds
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._stopping = False
+        self._idle_timer = None
+
+    def start(self):
+        threading.Thread(target=self._run_loop, daemon=True, name="dialogue").start()
+        self._ready.wait()
+        self._call(self.on_state, self.state)
+        return self
+
+    def stop(self):
+        self._call(self._shutdown)
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    @property
+    def spoken_text(self):
+        return " ".join(self.spoken_sentences)
+
+    # --- Thread-safe entry points ---
+
+    def hear(self, query, track_ids=()):
+        """Voice input. Ignored while nobody is present; echoes of our own speech are dropped."""
+        if self.state == AppState.IDLE:
+            return "ignored"
+        check_echo, self._check_echo = self._check_echo, False
+        if self.state == AppState.SPEAKING or check_echo:
+            if looks_like_echo(query, self.spoken_text):
+                return "echo"
+            self.barge_in()
+        return self.submit(query, "voice", track_ids)
+
+    def speech_started(self):
+        """Voice activity opened an utterance: stops the reply now instead of after recognition."""
+        if self.state == AppState.SPEAKING:
+            # The transcript still gets the echo check once it arrives, although playback has stopped.
+            self._check_echo = True
+            self.barge_in()
+
+    def submit(self, query, source="text", track_ids=()):
+        """Queues a query. Returns "queued", "duplicate" (already queued or running) or "busy" (queue full)."""
+        key = normalize_query(query)
+        request_id = next(self._request_ids)
+        with self._lock:
+            if key in self._keys:
+                metrics.count("dialogue_duplicates")
+                return "duplicate"
+            if self._pending >= self.max_queued:
+                metrics.count("dialogue_rejected")
+                return "busy"
+            self._keys[key] = request_id
+            self._pending += 1
+        request = TurnRequest(request_id, "query", query, key, source, frozenset(track_ids), None)
+        self._call(self._enqueue, request)
+        return "queued"
+
+    def greet(self, text, audio_path, track_id):
+        """Plays a prefetched greeting, but only if the assistant is listening with nothing else to do."""
+        with self._lock:
+            if self._pending or self.state != AppState.LISTENING:
+                return False
+            self._pending += 1
+        request = TurnRequest(next(self._request_ids), "greeting", text, None, "greeting", frozenset([track_id]), audio_path)
+        self._call(self._enqueue, request)
+        return True
+
+    def barge_in(self):
+        """Stops the current reply mid-utterance so the visitor can speak."""
+        with self._lock:
+            # The turn is cancelled asynchronously; asking the same question again must not count as a duplicate of it.
+            if self._running and self._keys.get(self._running.key) == self._running.request_id:
+                del self._keys[self._running.key]
+        self._call(self._cancel_current, AppState.LISTENING, "✋ Visitor barged in; stopping speech.")
+
+    def visitor_present(self):
+        self._call(self._visitor_present)
+
+    def listen(self):
+        """Starts listening on request (e.g. a button) even with nobody in view; times out back to idle."""
+        self._call(self._listen)
+
+    def tracks_changed(self, remaining_track_ids):
+        """Cancels queued and running turns whose visitors have all left; goes idle when nobody remains."""
+        self._call(self._tracks_changed, frozenset(remaining_track_ids))
+
+    # --- Scheduler thread ---
+
+    def _call(self, callback, *args):
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Loop closed during shutdown.
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        while True:
+            request = await self._queue.get()
+            task = asyncio.ensure_future(self._run_turn(request))
+            self._current = (request, task)
+            with self._lock:
+                self._running = request
+            try:
+                await task
+            except asyncio.CancelledError:
+                if self._stopping or not task.cancelled():
+                    raise  # The scheduler itself is shutting down.
+            finally:
+                self._current = None
+                with self._lock:
+                    self._running = None
+                self._release(request)
+
+    def _shutdown(self):
+        self._stopping = True
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def _enqueue(self, request):
+        self._queue.put_nowait(request)
+
+    def _release(self, request):
+        with self._lock:
+            if self._keys.get(request.key) == request.request_id:
+                del self._keys[request.key]
+            self._pending -= 1
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.on_state(state)
+        if state == AppState.LISTENING and not self._present:
+            self._arm_idle_timer()
+
+    def _arm_idle_timer(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+        self._idle_timer = self._loop.call_later(NO_VISITOR_TIMEOUT, self._idle_if_nobody)
+
+    def _idle_if_nobody(self):
+        self._idle_timer = None
+        if self.state == AppState.LISTENING and not self._present and not self._current and self._queue.empty():
+            self._set_state(AppState.IDLE)
+
+    def _listen(self):
+        if self.state == AppState.IDLE:
+            self._set_state(AppState.LISTENING)
+
+    def _visitor_present(self):
+        self._present = True
+        if self.state == AppState.IDLE:
+            self._set_state(AppState.LISTENING)
+
+    def _tracks_changed(self, remaining):
+        self._present = bool(remaining)
+        gone = lambda request: request.track_ids and not (request.track_ids & remaining)
+        settle = AppState.LISTENING if remaining else AppState.IDLE
+        if self._current and gone(self._current[0]):
+            self._cancel_current(settle, f"🚶 Visitor left; cancelling turn {self.turn_id}.")
+        kept = []
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if gone(request):
+                self.log(f"🚶 Visitor left; dropping queued query {request.query!r}.")
+                self._release(request)
+            else:
+                kept.append(request)
+        for request in kept:
+            self._queue.put_nowait(request)
+        if not remaining and not self._current:
+            self._set_state(AppState.IDLE)
+
+    def _cancel_current(self, settle_state, message):
+        if not self._current:
+            if self.state == AppState.SPEAKING:
+                self._set_state(settle_state)
+            return
+        request, task = self._current
+        self.log(message)
+        self._cancelled[request.request_id] = settle_state
+        self.speech.interrupt()
+        self.player.stop()
+        task.cancel()
+        metrics.count("turns_cancelled")
+
+    async def _run_turn(self, request):
+        self.turn_id += 1
+        turn_id = self.turn_id
+        turn_start = time.perf_counter()
+        self.spoken_sentences = []
+        try:
+            if request.kind == "greeting":
+                await self._play_greeting(request)
+            else:
+                await self._answer(request, turn_id, turn_start)
+            await self._wait_speech()
+        except Exception as e:
+            self.log(f"❌ Dialogue error: {str(e) or type(e).__name__}")
+            self.on_error("Sorry, an error occurred.")
+        finally:
+            metrics.record("turn", time.perf_counter() - turn_start, turn_start, turn=turn_id, kind=request.kind)
+            settle = self._cancelled.pop(request.request_id, None)
+            if settle is None:
+                settle = AppState.LISTENING if self._present or request.source == "text" else AppState.IDLE
+            self._set_state(settle)
+
+    async def _answer(self, request, turn_id, turn_start):
+        loop = asyncio.get_running_loop()
+        self.speech.begin_turn(turn_start)
+        self._set_state(AppState.THINKING)
+        self.on_query(request.query)
+        try:
+            cached = await asyncio.wait_for(loop.run_in_executor(None, self.answer_cache.lookup, request.query),
+                                            CACHE_LOOKUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            cached = None
+        if cached:
+            # Cache hits skip the LLM and go straight to TTS with the stored emotion tag.
+            chunker = SentenceChunker()
+            for sentence in chunker.feed(cached["answer"]) + chunker.flush():
+                self._say(sentence)
+            metrics.count("answer_cache_hits")
+            stats = self.answer_cache.snapshot()
+            self.log(f"⚡ Answer cache hit (similarity {cached['similarity']:.2f}, hit rate {stats['hit_rate']:.0%}, "
+                     f"{stats['saved_seconds']:.1f}s saved so far)")
+            self.on_reply(cached["answer"], cached["emotion"], True)
+            return
+
+        text, emotion = await self._generate(self.build_prompt(request.query), turn_id)
+        latency = time.perf_counter() - turn_start
+        self.log(f"💬 Reply complete in {latency:.2f}s (emotion: {emotion})")
+        self.on_reply(text, emotion, False)
+        await loop.run_in_executor(None, self.answer_cache.store, request.query, text, emotion, latency)
+
+    async def _generate(self, prompt, turn_id):
+        """Speaks the reply as it streams in; retries with backoff if the LLM fails before anything was said."""
+        for attempt in range(self.llm.retries + 1):
+            chunker = SentenceChunker()
+            try:
+                with metrics.span("llm", turn=turn_id, attempt=attempt, streamed=self.stream):
+                    if self.stream:
+                        async for text in self.llm.astream(prompt):
+                            for sentence in chunker.feed(text):
+                                self._say(sentence)
+                        for sentence in chunker.flush():
+                            self._say(sentence)
+                        return chunker.text, chunker.emotion or DEFAULT_EMOTION
+                    text, emotion = split_emotion_tag(await self.llm.agenerate(prompt))
+                    self._say(text)
+                    return text, emotion
+            except Exception as e:
+                if chunker.sentences or attempt == self.llm.retries:
+                    raise
+                delay = self.llm.backoff * 2 ** attempt
+                metrics.count("llm_retries")
+                self.log(f"⚠️ LLM attempt {attempt + 1} failed ({str(e) or type(e).__name__}); retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    def _say(self, sentence):
+        self.spoken_sentences.append(sentence)
+        self._set_state(AppState.SPEAKING)
+        self.on_sentence(self.spoken_text)
+        self.speech.put(sentence)
+
+    async def _play_greeting(self, request):
+        self.spoken_sentences = [request.query]
+        self._set_state(AppState.SPEAKING)
+        self.on_sentence(request.query)
+        self.player.play(request.payload, track=min(request.track_ids))
+
+    async def _wait_speech(self):
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(None, self._drain_speech), SPEECH_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.log("⚠️ Reply ran past the speech timeout; cutting it off.")
+            self.speech.interrupt()
+            self.player.stop()
+
+    def _drain_speech(self):
+        self.speech.wait()
+        self.player.wait()
@@ -0,0 +1,214 @@
+import queue
+import re
+import threading
+import time
+
+import metrics
+
+# --- Streaming Configuration ---
+EMOTION_TAGS = ("HAPPY", "SAD", "ANGRY", "PAMPER", "NEUTRAL")
+DEFAULT_EMOTION = "NEUTRAL"
+# A sentence ends at . ! or ? once the following whitespace has arrived, or at a line break.
+SENTENCE_END = re.compile(r"[.!?]+(?=\s)|\n")
+
+
+def as_emotion_tag(text):
+    """Returns the emotion tag if the text is nothing but a tag (any case/punctuation), else None."""
+    word = text.strip().strip("*.!:- ").upper()
+    return word if word in EMOTION_TAGS else None
+
+
+def split_emotion_tag(text):
+    """Splits a complete reply into (spoken_text, emotion_tag), dropping the tag line."""
+    lines = [line for line in text.strip().splitlines()]
+    emotion = DEFAULT_EMOTION
+    while lines and (not lines[-1].strip() or as_emotion_tag(lines[-1])):
+        emotion = as_emotion_tag(lines.pop()) or emotion
+    return "\n".join(lines).strip(), emotion
+
+
+class SentenceChunker:
+    """Turns streamed text fragments into complete sentences, holding back the emotion tag."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.emotion = None
+        self.sentences = []
+
+    def feed(self, text):
+        """Adds a fragment and returns the sentences it completed."""
+        self.buffer += text
+        completed = []
+        while True:
+            match = SENTENCE_END.search(self.buffer)
+            if not match:
+                break
+            piece, self.buffer = self.buffer[:match.end()], self.buffer[match.end():]
+            self._emit(piece, completed)
+        return completed
+
+    def flush(self):
+        """Ends the stream and returns whatever sentence was still buffered."""
+        completed = []
+        piece, self.buffer = self.buffer, ""
+        self._emit(piece, completed)
+        return completed
+
+    def _emit(self, piece, completed):
+        piece = piece.strip()
+        if not piece:
+            return
+        tag = as_emotion_tag(piece)
+        if tag:
+            self.emotion = tag
+            return
+        self.sentences.append(piece)
+        completed.append(piece)
+
+    @property
+    def text(self):
+        return " ".join(self.sentences)
+
+
+def stream_reply(model, prompt, on_sentence):
+    """Streams a reply from a Gemini-style model, calling on_sentence for each complete sentence.
+
+    Returns (spoken_text, emotion_tag).
+    """
+    chunker = SentenceChunker()
+    for chunk in model.generate_content(prompt, stream=True):
+        for sentence in chunker.feed(chunk.text or ""):
+            on_sentence(sentence)
+    for sentence in chunker.flush():
+        on_sentence(sentence)
+    return chunker.text, chunker.emotion or DEFAULT_EMOTION
+
+
+class SpeechQueue:
+    """Single TTS worker thread that speaks queued sentences in order.
+
+    Sentences are spoken as soon as they are queued, so synthesis of the first
+    sentence overlaps with generation of the rest. ``begin_turn()`` marks the start
+    of a turn for the time-to-first-audio measurement.
+
+    With a ``play`` callback, ``speak(sentence)`` only renders and returns the audio,
+    and ``play(audio)`` is called only if no ``interrupt()`` or new turn happened
+    since the sentence was queued, so a sentence still rendering at barge-in time
+    is never played.
+    """
+
+    def __init__(self, speak, log=print, play=None):
+        self.speak = speak
+        self.play = play
+        self.log = log
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by interrupt() and begin_turn(); sentences from older generations are dropped
+        self._turn_start = None
+        self._interrupted = False
+        self.time_to_first_audio = None
+        threading.Thread(target=self._run, daemon=True, name="speech").start()
+
+    def begin_turn(self, started_at=None):
+        with self._lock:
+            self._generation += 1
+            self._turn_start = started_at or time.perf_counter()
+            self._interrupted = False
+            self.time_to_first_audio = None
+
+    def put(self, sentence):
+        with self._lock:
+            if not self._interrupted:
+                self._queue.put((self._generation, sentence))
+
+    def interrupt(self):
+        """Drops queued sentences and ignores new ones until the next turn begins."""
+        with self._lock:
+            self._generation += 1
+            self._interrupted = True
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+
+    def wait(self):
+        """Blocks until every queued sentence has been spoken."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            generation, sentence = self._queue.get()
+            try:
+                if generation != self._generation:
+                    continue
+                audio = self.speak(sentence)
+                if self.play:
+                    with self._lock:
+                        # Checked under the lock so an interrupt() lands either before play() or after it.
+                        if generation != self._generation:
+                            continue
+                        self.play(audio)
+                # The sentence's audio has now been handed to the player.
+                if self._turn_start is not None and self.time_to_first_audio is None:
+                    self.time_to_first_audio = time.perf_counter() - self._turn_start
+                    metrics.record("first_audio", self.time_to_first_audio, self._turn_start)
+                    self.log(f"🔊 Time to first audio: {self.time_to_first_audio * 1000:.0f} ms")
+            except Exception as e:
+                self.log(f"❌ TTS Error: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def looks_like_echo(heard, spoken_text, overlap=0.7):
+    """True if most words heard by the microphone are words the assistant itself is saying."""
+    heard_words = re.findall(r"[a-z0-9']+", heard.lower())
+    spoken_words = set(re.findall(r"[a-z0-9']+", spoken_text.lower()))
+    if not heard_words or not spoken_words:
+        return False
+    return sum(word in spoken_words for word in heard_words) / len(heard_words) >= overlap
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """Local stand-in for a Gemini model that replays a canned reply in timed chunks.
+
+    ``first_chunk_delay`` simulates time to first token and ``chunk_delay`` the gap
+    between chunks, so streaming and time-to-first-audio can be exercised offline.
+    """
+
+    def __init__(self, reply="Hello! I am the TIST assistant. How can I help you today?\nHAPPY",
+                 chunk_size=12, first_chunk_delay=0.5, chunk_delay=0.05):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+
+    def _chunks(self):
+        time.sleep(self.first_chunk_delay)
+        for i in range(0, len(self.reply), self.chunk_size):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeChunk(self.reply[i:i + self.chunk_size])
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if stream:
+            return self._chunks()
+        chunks = list(self._chunks())
+        return FakeChunk("".join(chunk.text for chunk in chunks))
+
+
+if __name__ == "__main__":
+    # Offline demo: prints sentences as they would be handed to TTS.
+    fake_model = FakeStreamingModel(first_chunk_delay=0.3, chunk_delay=0.1)
+    start = time.perf_counter()
+    speech = SpeechQueue(lambda sentence: print(f"  [{time.perf_counter() - start:.2f}s] speak: {sentence}"))
+    speech.begin_turn(start)
+    text, emotion = stream_reply(fake_model, "Hi", speech.put)
+    speech.wait()
+    print(f"Reply: {text!r} Emotion: {emotion}")
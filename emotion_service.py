@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import Counter, deque
+
+import cv2
+import numpy as np
+
+import metrics
+
+# --- Emotion Service Configuration ---
+EMOTION_RATE_HZ = 4.0  # Batches per second; each batch covers every face submitted since the last one
+EMOTION_WINDOW = 5
+EMOTION_EMA_ALPHA = 0.4
+EMOTION_INPUT_SIZE = 48
+EMOTION_ROI_MARGIN = 0.15
+EMOTION_LOAD_RETRY_SECONDS = 60.0  # After a failed model load (e.g. offline weights download), wait this long to retry
+# Output order of DeepFace's facial-expression model.
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+def crop_face(frame, box, margin=EMOTION_ROI_MARGIN):
+    """Cuts a square, margin-padded face crop out of a frame given a (top, right, bottom, left) box."""
+    top, right, bottom, left = box
+    height, width = frame.shape[:2]
+    cx, cy = (left + right) / 2.0, (top + bottom) / 2.0
+    half = max(right - left, bottom - top) * (1 + 2 * margin) / 2.0
+    x0, x1 = max(0, int(cx - half)), min(width, int(cx + half))
+    y0, y1 = max(0, int(cy - half)), min(height, int(cy + half))
+    return frame[y0:y1, x0:x1]
+
+
+def preprocess_faces(rois, color=cv2.COLOR_BGR2GRAY):
+    """Turns face crops into the (N, 48, 48, 1) grayscale batch the emotion model expects."""
+    batch = np.empty((len(rois), EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE, 1), dtype=np.float32)
+    for i, roi in enumerate(rois):
+        gray = cv2.cvtColor(roi, color) if roi.ndim == 3 else roi
+        batch[i, :, :, 0] = cv2.resize(gray, (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE), interpolation=cv2.INTER_AREA)
+    batch /= 255.0
+    return batch
+
+
+def load_emotion_model():
+    """Builds DeepFace's emotion model once and returns the underlying Keras model."""
+    from deepface import DeepFace
+    try:
+        client = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+    except TypeError:
+        # Older DeepFace releases take only the model name.
+        client = DeepFace.build_model("Emotion")
+    return getattr(client, "model", client)
+
+
+class EmotionService:
+    """Rate-limited, batched emotion recognition with per-track temporal smoothing.
+
+    Callers ``submit()`` pre-cropped face ROIs keyed by track id; only the newest ROI
+    per track is kept. A worker thread wakes ``rate_hz`` times per second, runs every
+    pending ROI through the model in one batch and folds the probabilities into a
+    smoothed distribution per track (EMA, or majority vote over the last ``window``
+    results). When the worker isn't started, ``process_pending()`` runs a batch inline.
+    A failed model load is retried at most every ``EMOTION_LOAD_RETRY_SECONDS``;
+    in between, pending ROIs are dropped and no emotion is reported.
+    """
+
+    def __init__(self, rate_hz=EMOTION_RATE_HZ, window=EMOTION_WINDOW, smoothing="ema", alpha=EMOTION_EMA_ALPHA, log=print):
+        self.rate_hz = rate_hz
+        self.window = window
+        self.smoothing = smoothing
+        self.alpha = alpha
+        self.log = log
+        self.model = None
+        self._model_lock = threading.Lock()
+        self._load_failed_at = None
+        self._load_error = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._smoothed = {}
+        self._history = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.stats = {"hits": 0, "misses": 0, "submitted": 0, "dropped": 0, "inferences": 0,
+                      "batches": 0, "errors": 0, "total_latency": 0.0, "last_latency": 0.0}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="emotion")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def submit(self, track_id, roi):
+        if roi is None or roi.size == 0:
+            return
+        with self._lock:
+            if track_id in self._pending:
+                self.stats["dropped"] += 1
+            self._pending[track_id] = roi
+            self.stats["submitted"] += 1
+
+    def forget(self, track_id):
+        with self._lock:
+            self._pending.pop(track_id, None)
+            self._smoothed.pop(track_id, None)
+            self._history.pop(track_id, None)
+
+    def distribution(self, track_id):
+        """Returns the smoothed {label: probability} for a track, or None if nothing has been inferred yet."""
+        with self._lock:
+            probs = self._smoothed.get(track_id)
+            if probs is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return dict(zip(EMOTION_LABELS, probs.tolist()))
+
+    def dominant(self, track_id):
+        with self._lock:
+            probs = self._smoothed.get(track_id)
+            history = self._history.get(track_id)
+            if probs is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            if self.smoothing == "majority" and history:
+                return Counter(history).most_common(1)[0][0]
+            return EMOTION_LABELS[int(np.argmax(probs))]
+
+    def warm_up(self):
+        """Loads the model and runs one blank face through it, so the first visitor doesn't pay for either."""
+        with self._model_lock:
+            if self.model is not None:
+                return
+            if self.load_backing_off:
+                raise RuntimeError(f"emotion model unavailable: {self._load_error}")
+            start = time.perf_counter()
+            try:
+                model = load_emotion_model()
+                model.predict(np.zeros((1, EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE, 1), dtype=np.float32), verbose=0)
+            except Exception as e:
+                self._load_failed_at = time.monotonic()
+                self._load_error = str(e) or type(e).__name__
+                raise
+            self.model = model
+            metrics.record("emotion_warm_up", time.perf_counter() - start, start)
+            self.log(f"😀 Emotion model ready in {time.perf_counter() - start:.1f}s")
+
+    @property
+    def load_backing_off(self):
+        """True while a recent model-load failure means loading shouldn't be retried yet."""
+        return (self.model is None and self._load_failed_at is not None
+                and time.monotonic() - self._load_failed_at < EMOTION_LOAD_RETRY_SECONDS)
+
+    def predict(self, rois, color=cv2.COLOR_BGR2GRAY):
+        """Runs one batch through the model and returns an (N, 7) probability array."""
+        if self.model is None:
+            self.warm_up()
+        batch = preprocess_faces(rois, color)
+        start = time.perf_counter()
+        probs = np.asarray(self.model.predict(batch, verbose=0), dtype=np.float32)
+        latency = time.perf_counter() - start
+        metrics.record("emotion_model", latency, start, batch=len(rois))
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["inferences"] += len(rois)
+            self.stats["total_latency"] += latency
+            self.stats["last_latency"] = latency
+        return probs
+
+    def process_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self.load_backing_off:
+            return 0
+        track_ids = list(pending)
+        try:
+            probs = self.predict([pending[track_id] for track_id in track_ids])
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                errors = self.stats["errors"]
+            if errors == 1 or errors % 100 == 0:
+                self.log(f"❌ Emotion inference error ({errors} so far): {e}")
+            return 0
+
+        with self._lock:
+            for track_id, track_probs in zip(track_ids, probs):
+                previous = self._smoothed.get(track_id)
+                if previous is None or self.smoothing != "ema":
+                    self._smoothed[track_id] = track_probs
+                else:
+                    self._smoothed[track_id] = self.alpha * track_probs + (1 - self.alpha) * previous
+                history = self._history.setdefault(track_id, deque(maxlen=self.window))
+                history.append(EMOTION_LABELS[int(np.argmax(track_probs))])
+        return len(track_ids)
+
+    def _run(self):
+        while self.model is None:
+            try:
+                self.warm_up()
+            except Exception as e:
+                # Keep the worker alive (so frames never load inline) and retry off the vision threads.
+                self.log(f"❌ Could not load emotion model: {e}; retrying in {EMOTION_LOAD_RETRY_SECONDS:.0f}s")
+                if self._stop_event.wait(EMOTION_LOAD_RETRY_SECONDS):
+                    return
+        interval = 1.0 / self.rate_hz
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            self.process_pending()
+            self._stop_event.wait(max(0.0, interval - (time.perf_counter() - started)))
+
+    def snapshot(self):
+        """Counters for tuning the rate: cache hits/misses, dropped ROIs and model latency."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["mean_latency"] = stats["total_latency"] / stats["batches"] if stats["batches"] else 0.0
+        stats["rate_hz"] = self.rate_hz
+        return stats
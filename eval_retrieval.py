@@ -0,0 +1,81 @@
+"""Offline evaluation of retrieval-based context selection.
+
+For a fixed set of receptionist questions, compares the size of the old prompt
+(GEMINI_PROMPT + full COLLEGE_CONTEXT) with the retrieved one and checks whether the
+retrieved sections contain the fact needed to answer. No network access is needed.
+
+    python eval_retrieval.py --top-k 3 --budget 350
+"""
+import argparse
+import json
+
+from context_retrieval import ContextRetriever, estimate_tokens
+from prompts import COLLEGE_CONTEXT, GEMINI_PROMPT
+
+# (question, text the retrieved context must contain; None = no college context expected)
+EVAL_QUESTIONS = [
+    ("How do B.Tech admissions work?", "KEAM"),
+    ("What is the KEAM quota for B.Tech?", "50%"),
+    ("How can I join the MBA program?", "KMAT"),
+    ("Is there a hostel for girls?", "Hostels"),
+    ("Do you have college buses?", "buses"),
+    ("Which companies come for placements?", "TCS"),
+    ("What is the phone number of the college?", "2748388"),
+    ("What is the email address?", "mail@tistcochin.edu.in"),
+    ("Is TIST NAAC accredited?", "NAAC"),
+    ("Which B.Tech branches are offered?", "Robotics"),
+    ("What M.Tech specializations are there?", "VLSI"),
+    ("Where is the college located?", "Arakkunnam"),
+    ("Which university is TIST affiliated to?", "KTU"),
+    ("Is there a library?", "library"),
+    ("Tell me about TIST", "Established"),
+    ("Tell me about Toc H Institute", "Established"),
+    ("Tell me about the college", "Established"),
+    ("Who wrote Romeo and Juliet?", None),
+    ("How are you feeling today?", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=350, help="context token budget")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    retriever = ContextRetriever(COLLEGE_CONTEXT, top_k=args.top_k, token_budget=args.budget)
+    rows = []
+    for question, expected in EVAL_QUESTIONS:
+        full_prompt = f"{GEMINI_PROMPT}\n\n{COLLEGE_CONTEXT}\n\nUser Query: \"{question}\""
+        prompt = retriever.build_prompt(question)
+        context = "\n".join(section.text for section in retriever.retrieve(question))
+        hit = expected.lower() in context.lower() if expected else not context
+        rows.append({"question": question, "full_tokens": estimate_tokens(full_prompt),
+                     "retrieved_tokens": estimate_tokens(prompt),
+                     "sections": [section.title.split(": ", 1)[-1] for section in retriever.retrieve(question)],
+                     "hit": hit})
+
+    full = sum(row["full_tokens"] for row in rows)
+    retrieved = sum(row["retrieved_tokens"] for row in rows)
+    report = {
+        "questions": len(rows),
+        "hit_rate": sum(row["hit"] for row in rows) / len(rows),
+        "mean_full_prompt_tokens": full / len(rows),
+        "mean_retrieved_prompt_tokens": retrieved / len(rows),
+        # The persona instructions are sent once as a system instruction, so they are not counted per query.
+        "system_instruction_tokens": estimate_tokens(GEMINI_PROMPT),
+        "reduction": 1 - retrieved / full,
+        "rows": rows,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for row in rows:
+        mark = "✅" if row["hit"] else "❌"
+        print(f"{mark} {row['question']:<45} {row['full_tokens']:>5} -> {row['retrieved_tokens']:>4} tokens  {row['sections']}")
+    print(f"\nHit rate: {report['hit_rate']:.0%}   mean prompt: {report['mean_full_prompt_tokens']:.0f} -> "
+          f"{report['mean_retrieved_prompt_tokens']:.0f} tokens ({report['reduction']:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
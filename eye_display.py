@@ -0,0 +1,224 @@
+import json
+import socket
+import struct
+import threading
+import time
+
+# --- Eye Display IPC Configuration ---
+EYE_ANIMATION_HOST = '127.0.0.1'
+EYE_ANIMATION_PORT = 12345
+CONNECT_TIMEOUT = 0.5
+SEND_TIMEOUT = 0.5
+ACK_TIMEOUT = 1.0  # A display that stops acknowledging frames this long is treated as disconnected
+RECONNECT_MIN_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+# Frames are a 4-byte big-endian payload length followed by a compact UTF-8 JSON object.
+# The display answers every frame with {"ack": seq} once it has been shown.
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024
+
+
+def encode_message(message):
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_message(sock):
+    """Reads one framed message from a socket; returns None when the peer closed the connection."""
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Eye display frame too large: {size} bytes")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+class EyeDisplayClient:
+    """Persistent, non-blocking connection to the eye-animation display.
+
+    ``update()`` only records the newest state/emotion and wakes the sender thread,
+    so callers on the dialogue or vision threads never wait on the socket. If the
+    display lags, intermediate updates are coalesced and only the latest snapshot is
+    sent. Only one frame is in flight at a time: the next one goes out once the
+    display acknowledges the previous one, so a slow display never builds up a
+    backlog of stale states. Dropped connections are re-established with
+    exponential backoff and the current snapshot is re-sent so the display
+    resynchronizes.
+    """
+
+    def __init__(self, host=EYE_ANIMATION_HOST, port=EYE_ANIMATION_PORT, log=print):
+        self.host = host
+        self.port = port
+        self.log = log
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._snapshot = {"seq": 0, "state": None, "emotion": None}
+        self._sent_seq = 0
+        self._sock = None
+        self._thread = None
+        self.stats = {"updates": 0, "sent": 0, "coalesced": 0, "connects": 0, "errors": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="eye-display")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._close()
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def update(self, state=None, emotion=None):
+        """Records a new state and/or emotion for the display and returns its sequence number."""
+        with self._lock:
+            if state is not None:
+                self._snapshot["state"] = state
+            if emotion is not None:
+                self._snapshot["emotion"] = emotion
+            self._snapshot["seq"] += 1
+            self.stats["updates"] += 1
+            seq = self._snapshot["seq"]
+        self._wake.set()
+        return seq
+
+    def _run(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop_event.is_set():
+            if self._sock is None:
+                if not self._connect():
+                    self._stop_event.wait(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+                delay = RECONNECT_MIN_DELAY
+                self._sent_seq = 0  # Re-send the current snapshot on every new connection.
+
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            with self._lock:
+                message = dict(self._snapshot, t=time.time())
+            if message["seq"] == self._sent_seq or message["state"] is None and message["emotion"] is None:
+                continue
+            try:
+                self._sock.settimeout(SEND_TIMEOUT)
+                self._sock.sendall(encode_message(message))
+                self._sock.settimeout(ACK_TIMEOUT)
+                ack = read_message(self._sock)
+                if ack is None or ack.get("ack") != message["seq"]:
+                    raise ConnectionError("display closed the connection" if ack is None else f"unexpected reply {ack}")
+            except (OSError, ValueError) as e:
+                self.stats["errors"] += 1
+                self.log(f"⚠️ Eye display connection lost: {e}")
+                self._close()
+                self._wake.set()
+                continue
+            self.stats["coalesced"] += message["seq"] - self._sent_seq - 1 if self._sent_seq else 0
+            self.stats["sent"] += 1
+            self._sent_seq = message["seq"]
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        except OSError:
+            return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self.stats["connects"] += 1
+        self.log(f"👀 Connected to eye display at {self.host}:{self.port}")
+        self._wake.set()
+        return True
+
+    def _close(self):
+        sock, self._sock = self._sock, None
+        if sock:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class EyeAnimationServer:
+    """Local stand-in for the eye-animation display: accepts clients, reports and acknowledges each message.
+
+    ``on_message(message, received_at)`` is called for every frame, with
+    ``received_at`` from ``time.time()``. ``render_delay`` simulates a slow display.
+    """
+
+    def __init__(self, host=EYE_ANIMATION_HOST, port=EYE_ANIMATION_PORT, on_message=None, render_delay=0.0, log=print):
+        self.on_message = on_message or (lambda message, received_at: log(f"👀 {message}"))
+        self.render_delay = render_delay
+        self.log = log
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()
+        self._stop_event = threading.Event()
+        self._connections = set()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True, name="eye-server").start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._server.close()
+        for conn in list(self._connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        self._connections.add(conn)
+        try:
+            with conn:
+                while not self._stop_event.is_set():
+                    message = read_message(conn)
+                    if message is None:
+                        return
+                    self.on_message(message, time.time())
+                    if self.render_delay:
+                        time.sleep(self.render_delay)
+                    conn.sendall(encode_message({"ack": message.get("seq")}))
+        except (OSError, ValueError) as e:
+            if not self._stop_event.is_set():
+                self.log(f"❌ Eye display connection error: {e}")
+        finally:
+            self._connections.discard(conn)
+
+if __name__ == "__main__":
+    server = EyeAnimationServer().start()
+    print(f"Eye animation stand-in listening on {server.address[0]}:{server.address[1]} (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
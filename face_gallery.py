@@ -0,0 +1,390 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# --- Gallery Configuration ---
+KNOWN_FACES_DIR = "known_faces"
+FACE_CACHE_DIR = "face_cache"
+GALLERY_VERSION = 3
+GALLERY_INDEX_FILE = "gallery.json"
+GALLERY_MATRIX_FILE = "gallery.npy"
+ENCODING_SIZE = 128
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+# Photos are decoded at reduced size before detection; HOG + encoding cost grows with pixel count.
+ENROLL_MAX_IMAGE_SIZE = 800
+ENROLL_WORKERS = None  # None = one process per CPU core
+# Gallery hygiene, applied per identity when building the matcher; image files are never touched.
+DUPLICATE_DISTANCE = 0.1  # Samples closer than this to an already kept one add nothing
+OUTLIER_DISTANCE = 0.55  # Samples this far from the person's median encoding are likely someone else
+MIN_SAMPLES_FOR_OUTLIERS = 3
+MAX_SAMPLES_PER_IDENTITY = 20
+GALLERY_POLL_SECONDS = 2.0
+
+
+def file_sha1(path, chunk_size=1 << 16):
+    """Returns the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_downscaled_image(image_path, max_size=ENROLL_MAX_IMAGE_SIZE):
+    """Decodes an image as RGB with its longest side capped at max_size pixels."""
+    from PIL import Image
+    with Image.open(image_path) as image:
+        if max_size:
+            # Lets the JPEG decoder skip work by decoding straight to a smaller scale.
+            image.draft("RGB", (max_size, max_size))
+        image = image.convert("RGB")
+        if max_size and max(image.size) > max_size:
+            image.thumbnail((max_size, max_size))
+        return np.array(image)
+
+
+def encode_image(image_path, max_size=ENROLL_MAX_IMAGE_SIZE):
+    """Detects faces in one image and encodes the largest. Returns (encoding or None, face_count)."""
+    import face_recognition
+    image = load_downscaled_image(image_path, max_size)
+    face_locations = face_recognition.face_locations(image)
+    if not face_locations:
+        return None, 0
+    # In a group photo the largest face is taken to be the person being enrolled.
+    largest = max(face_locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    encoding = face_recognition.face_encodings(image, [largest])[0]
+    return np.asarray(encoding, dtype=np.float32), len(face_locations)
+
+
+def _encode_worker(args):
+    image_path, max_size = args
+    try:
+        return encode_image(image_path, max_size) + (None,)
+    except Exception as e:
+        return None, None, str(e)
+
+
+def encode_images(image_paths, max_size=ENROLL_MAX_IMAGE_SIZE, workers=ENROLL_WORKERS, progress=None):
+    """Encodes many images on a process pool.
+
+    Yields (image_path, encoding, face_count, error) as images finish, in completion order.
+    ``progress(done, total)`` is called after each image.
+    """
+    total = len(image_paths)
+    if total == 0:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or total == 1:
+        for done, image_path in enumerate(image_paths, 1):
+            encoding, face_count, error = _encode_worker((image_path, max_size))
+            if progress:
+                progress(done, total)
+            yield image_path, encoding, face_count, error
+        return
+
+    # Spawned, not forked: the pool is started from a background thread while camera, Tk and model threads run.
+    with ProcessPoolExecutor(max_workers=min(workers, total), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(_encode_worker, (image_path, max_size)): image_path for image_path in image_paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            encoding, face_count, error = future.result()
+            if progress:
+                progress(done, total)
+            yield futures[future], encoding, face_count, error
+
+
+def scan_known_faces(known_faces_dir):
+    """Lists (relative_path, person_name, stat) for every image under known_faces/<name>/."""
+    found = []
+    if not os.path.isdir(known_faces_dir):
+        return found
+    for name in sorted(os.listdir(known_faces_dir)):
+        person_dir = os.path.join(known_faces_dir, name)
+        if not os.path.isdir(person_dir):
+            continue
+        for filename in sorted(os.listdir(person_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image_path = os.path.join(person_dir, filename)
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                continue
+            found.append((f"{name}/{filename}", name, stat))
+    return found
+
+
+class FaceGallery:
+    """Versioned on-disk cache of known-face encodings shared by every entry point.
+
+    The cache directory holds an ``.npy`` matrix of encodings (loaded memory-mapped)
+    and a JSON index recording, for each image, its owner, size, mtime and content
+    hash. ``sync()`` only re-encodes images that are new or whose content changed,
+    and drops rows for images that were deleted.
+    """
+
+    def __init__(self, known_faces_dir=KNOWN_FACES_DIR, cache_dir=FACE_CACHE_DIR, log=print,
+                 max_image_size=ENROLL_MAX_IMAGE_SIZE, workers=ENROLL_WORKERS, progress=None):
+        self.known_faces_dir = known_faces_dir
+        self.cache_dir = cache_dir
+        self.log = log
+        self.max_image_size = max_image_size
+        self.workers = workers
+        self.progress = progress
+        self.entries = {}
+        self.encodings = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.names = []
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, GALLERY_INDEX_FILE)
+
+    @property
+    def matrix_path(self):
+        return os.path.join(self.cache_dir, GALLERY_MATRIX_FILE)
+
+    def load_cache(self):
+        """Loads the cached index and memory-maps the encodings matrix. Returns False if unusable."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != GALLERY_VERSION:
+                self.log("Face gallery cache version changed, rebuilding.")
+                return False
+            if index.get("max_image_size") != self.max_image_size:
+                self.log("Face gallery enrollment settings changed, rebuilding.")
+                return False
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                self.log(f"⚠️ Warning: Face gallery cache unreadable, rebuilding. Error: {e}")
+            return False
+
+        entries = {entry["path"]: entry for entry in index.get("entries", [])}
+        rows = [entry["row"] for entry in entries.values() if entry.get("row") is not None]
+        if matrix.ndim != 2 or matrix.shape[1] != ENCODING_SIZE or len(rows) != matrix.shape[0]:
+            self.log("⚠️ Warning: Face gallery cache is inconsistent, rebuilding.")
+            return False
+
+        self.entries = entries
+        self.encodings = matrix
+        self.names = [None] * matrix.shape[0]
+        for entry in entries.values():
+            if entry.get("row") is not None:
+                self.names[entry["row"]] = entry["name"]
+        return True
+
+    def sync(self):
+        """Brings the cache in line with known_faces/. Returns (added, removed) image counts."""
+        if not self.entries:
+            self.load_cache()
+
+        start = time.time()
+        on_disk = scan_known_faces(self.known_faces_dir)
+        on_disk_paths = {rel_path for rel_path, _, _ in on_disk}
+        removed = [path for path in self.entries if path not in on_disk_paths]
+
+        kept_rows = []
+        new_entries = []
+        to_encode = []
+        for rel_path, name, stat in on_disk:
+            cached = self.entries.get(rel_path)
+            if cached and cached["name"] == name and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                new_entries.append(dict(cached))
+                continue
+            image_path = os.path.join(self.known_faces_dir, rel_path)
+            try:
+                sha1 = file_sha1(image_path)
+            except OSError as e:
+                self.log(f"⚠️ Warning: Could not read image {rel_path}. Error: {e}")
+                continue
+            entry = {"path": rel_path, "name": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1,
+                     "faces": None, "row": None}
+            if cached and cached["name"] == name and cached["sha1"] == sha1:
+                # Touched but not modified; keep the cached encoding.
+                entry["row"] = cached["row"]
+                entry["faces"] = cached.get("faces")
+                new_entries.append(entry)
+                continue
+            new_entries.append(entry)
+            to_encode.append(entry)
+
+        if not removed and not to_encode and len(new_entries) == len(self.entries):
+            if any(entry != self.entries[entry["path"]] for entry in new_entries):
+                self.encodings = np.array(self.encodings)
+                self._write(new_entries, self.encodings)
+                self.load_cache()
+            return 0, 0
+
+        new_vectors = {}
+        image_paths = {os.path.join(self.known_faces_dir, entry["path"]): entry["path"] for entry in to_encode}
+        if to_encode:
+            self.log(f"Enrolling {len(to_encode)} new or changed images...")
+        face_counts = {}
+        for image_path, encoding, face_count, error in encode_images(list(image_paths), self.max_image_size, self.workers, self.progress):
+            rel_path = image_paths[image_path]
+            face_counts[rel_path] = face_count
+            if error:
+                self.log(f"⚠️ Warning: Could not process image {rel_path}. Error: {error}")
+            elif face_count == 0:
+                self.log(f"⚠️ Warning: No face found in {rel_path}; not enrolled.")
+            else:
+                if face_count > 1:
+                    self.log(f"⚠️ Warning: {face_count} faces in {rel_path}; enrolled the largest.")
+                new_vectors[rel_path] = encoding
+
+        for entry in new_entries:
+            if entry["path"] in face_counts:
+                entry["faces"] = face_counts[entry["path"]]
+            if entry["path"] in new_vectors:
+                kept_rows.append(new_vectors[entry["path"]])
+                entry["row"] = len(kept_rows) - 1
+            elif entry["row"] is not None:
+                # A copy, not a view: a view would keep the old memory map (and its file) open through _write.
+                kept_rows.append(np.array(self.encodings[entry["row"]], dtype=np.float32, copy=True))
+                entry["row"] = len(kept_rows) - 1
+            else:
+                entry["row"] = None
+
+        matrix = np.vstack(kept_rows).astype(np.float32) if kept_rows else np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        # Release the old memory map before its file is replaced.
+        self.encodings = matrix
+        self._write(new_entries, matrix)
+        self.load_cache()
+        self.log(f"Face gallery updated: {len(to_encode)} encoded, {len(removed)} removed in {time.time() - start:.1f}s.")
+        return len(to_encode), len(removed)
+
+    def _write(self, entries, matrix):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        matrix_tmp = self.matrix_path + ".tmp.npy"
+        index_tmp = self.index_path + ".tmp"
+        np.save(matrix_tmp, np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(index_tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": GALLERY_VERSION, "dtype": "float32", "max_image_size": self.max_image_size,
+                       "entries": entries}, f, indent=1)
+        os.replace(matrix_tmp, self.matrix_path)
+        os.replace(index_tmp, self.index_path)
+        self.entries = {entry["path"]: entry for entry in entries}
+
+    def flagged(self):
+        """Images that did not contain exactly one face, as (relative_path, face_count)."""
+        return [(path, entry.get("faces")) for path, entry in sorted(self.entries.items()) if entry.get("faces") != 1]
+
+    def curate(self, max_samples=MAX_SAMPLES_PER_IDENTITY, duplicate_distance=DUPLICATE_DISTANCE,
+               outlier_distance=OUTLIER_DISTANCE):
+        """Returns (encodings, names, pruned) with near-duplicates and outliers left out and each identity capped.
+
+        ``encodings`` is an in-memory copy, safe to keep while the cache is rewritten.
+        ``pruned`` lists (relative_path, reason) for every enrolled sample left out.
+        """
+        rows_by_name = {}
+        for path, entry in sorted(self.entries.items()):
+            if entry.get("row") is not None:
+                rows_by_name.setdefault(entry["name"], []).append((entry["row"], path))
+
+        kept_rows, names, pruned = [], [], []
+        for name, rows in sorted(rows_by_name.items()):
+            samples = np.asarray(self.encodings[[row for row, _ in rows]], dtype=np.float32)
+            kept, reasons = curate_samples(samples, max_samples, duplicate_distance, outlier_distance)
+            kept_rows.extend(rows[i][0] for i in kept)
+            names.extend([name] * len(kept))
+            pruned.extend((rows[i][1], reason) for i, reason in sorted(reasons.items()))
+
+        encodings = np.asarray(self.encodings[kept_rows], dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if pruned:
+            summary = ", ".join(f"{count} {reason}" for reason, count in Counter(reason for _, reason in pruned).items())
+            self.log(f"Face gallery hygiene: left out {len(pruned)} samples ({summary}).")
+        return encodings, names, pruned
+
+
+def curate_samples(samples, max_samples=MAX_SAMPLES_PER_IDENTITY, duplicate_distance=DUPLICATE_DISTANCE,
+                   outlier_distance=OUTLIER_DISTANCE):
+    """Picks which of one person's encodings to match against.
+
+    Samples are visited from the most typical (closest to the median encoding)
+    outwards; outliers and near-duplicates of an already kept sample are dropped.
+    Beyond ``max_samples``, farthest-point sampling keeps the most varied ones.
+    Returns (kept_indices, {index: reason}) for the dropped ones.
+    """
+    if len(samples) == 0:
+        return [], {}
+    center = np.median(samples, axis=0)
+    to_center = np.linalg.norm(samples - center, axis=1)
+    check_outliers = len(samples) >= MIN_SAMPLES_FOR_OUTLIERS
+    kept, reasons = [], {}
+    for i in np.argsort(to_center, kind="stable"):
+        if kept and check_outliers and to_center[i] > outlier_distance:
+            reasons[int(i)] = "outlier"
+        elif kept and np.linalg.norm(samples[kept] - samples[i], axis=1).min() < duplicate_distance:
+            reasons[int(i)] = "duplicate"
+        else:
+            kept.append(int(i))
+
+    if len(kept) > max_samples:
+        selected = [kept[0]]
+        nearest = np.linalg.norm(samples[kept] - samples[kept[0]], axis=1)
+        while len(selected) < max_samples:
+            pick = int(np.argmax(nearest))
+            selected.append(kept[pick])
+            nearest = np.minimum(nearest, np.linalg.norm(samples[kept] - samples[kept[pick]], axis=1))
+        for i in kept:
+            if i not in selected:
+                reasons[i] = "over cap"
+        kept = selected
+    return sorted(kept), reasons
+
+
+class GalleryWatcher:
+    """Polls known_faces/ and re-syncs the gallery when images are added, changed or removed.
+
+    A change must look the same on two consecutive polls before it is synced, so
+    photos still being copied in are not encoded half-written. After a sync that
+    changed anything, ``on_update(encodings, names)`` gets the curated gallery.
+    """
+
+    def __init__(self, gallery, on_update, interval=GALLERY_POLL_SECONDS, log=print):
+        self.gallery = gallery
+        self.on_update = on_update
+        self.interval = interval
+        self.log = log
+        self._stop_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="gallery-watcher").start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _signature(self):
+        return tuple((path, stat.st_size, stat.st_mtime_ns) for path, _, stat in scan_known_faces(self.gallery.known_faces_dir))
+
+    def _run(self):
+        synced, pending = self._signature(), None
+        while not self._stop_event.wait(self.interval):
+            signature = self._signature()
+            if signature == synced or signature != pending:
+                pending = None if signature == synced else signature
+                continue
+            try:
+                added, removed = self.gallery.sync()
+                if added or removed:
+                    encodings, names, _ = self.gallery.curate()
+                    self.on_update(encodings, names)
+            except Exception as e:
+                self.log(f"❌ Gallery update failed: {e}")
+            synced, pending = signature, None
+
+
+def load_known_faces(known_faces_dir=KNOWN_FACES_DIR, cache_dir=FACE_CACHE_DIR, log=print, workers=ENROLL_WORKERS, progress=None):
+    """Loads the cached gallery, re-encoding only new or changed images. Returns curated (encodings, names)."""
+    gallery = FaceGallery(known_faces_dir, cache_dir, log=log, workers=workers, progress=progress)
+    gallery.sync()
+    encodings, names, _ = gallery.curate()
+    return encodings, names
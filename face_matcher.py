@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+import numpy as np
+
+# --- Matching Configuration ---
+MATCH_THRESHOLD = 0.6  # Same default tolerance as face_recognition.compare_faces
+UNKNOWN_NAME = "Person"
+# Coarse-to-fine search only pays off once the gallery is large.
+COARSE_TO_FINE_MIN_GALLERY = 10000
+COARSE_CANDIDATES = 3
+
+Match = namedtuple("Match", ["name", "distance"])
+
+
+class FaceMatcher:
+    """Batched nearest-neighbour matching of face encodings against the enrolled gallery.
+
+    Encodings are held in one contiguous float32 matrix together with per-person
+    centroids. ``match()`` scores every face in a frame against the gallery with a
+    single matrix product instead of one ``face_distance`` call per face.
+    """
+
+    def __init__(self, encodings, names, threshold=MATCH_THRESHOLD, coarse_to_fine=None, coarse_candidates=COARSE_CANDIDATES):
+        self.encodings = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+        self.names = list(names)
+        self.threshold = threshold
+        self.coarse_candidates = coarse_candidates
+        if coarse_to_fine is None:
+            coarse_to_fine = len(self.names) >= COARSE_TO_FINE_MIN_GALLERY
+        self.coarse_to_fine = coarse_to_fine
+
+        self.sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+        self.people = sorted(set(self.names))
+        person_index = {name: i for i, name in enumerate(self.people)}
+        self.labels = np.array([person_index[name] for name in self.names], dtype=np.int32)
+        self.person_rows = [np.flatnonzero(self.labels == i) for i in range(len(self.people))]
+        if self.people:
+            self.centroids = np.vstack([self.encodings[rows].mean(axis=0) for rows in self.person_rows]).astype(np.float32)
+        else:
+            self.centroids = np.empty((0, 128), dtype=np.float32)
+        self.centroid_sq_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _distances(queries, matrix, matrix_sq_norms):
+        # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g, computed for all pairs at once.
+        query_sq_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        sq = query_sq_norms + matrix_sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def distances(self, face_encodings):
+        """Returns the (faces x gallery) Euclidean distance matrix."""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        return self._distances(queries, self.encodings, self.sq_norms)
+
+    def match(self, face_encodings, k=1):
+        """Matches every face of a frame at once.
+
+        Returns one list of up to k Match(name, distance) per face, nearest first,
+        keeping only the best sample per person. Faces with no gallery entry under the
+        threshold get a single Match(UNKNOWN_NAME, best_distance).
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        if len(queries) == 0:
+            return []
+        if len(self.names) == 0:
+            return [[Match(UNKNOWN_NAME, float("inf"))] for _ in range(len(queries))]
+        if self.coarse_to_fine:
+            return [self._match_coarse_to_fine(query, k) for query in queries]
+
+        distance_matrix = self._distances(queries, self.encodings, self.sq_norms)
+        return [self._top_k(row, np.arange(len(row)), k) for row in distance_matrix]
+
+    def _match_coarse_to_fine(self, query, k):
+        query = query[None, :]
+        centroid_distances = self._distances(query, self.centroids, self.centroid_sq_norms)[0]
+        n_candidates = min(max(k, self.coarse_candidates), len(self.people))
+        candidates = np.argpartition(centroid_distances, n_candidates - 1)[:n_candidates]
+        rows = np.concatenate([self.person_rows[person] for person in candidates])
+        distances = self._distances(query, self.encodings[rows], self.sq_norms[rows])[0]
+        return self._top_k(distances, rows, k)
+
+    def _top_k(self, distances, rows, k):
+        order = np.argsort(distances)
+        results = []
+        seen = set()
+        for i in order:
+            if distances[i] > self.threshold:
+                break
+            name = self.names[rows[i]]
+            if name in seen:
+                continue
+            seen.add(name)
+            results.append(Match(name, float(distances[i])))
+            if len(results) == k:
+                break
+        if not results:
+            results.append(Match(UNKNOWN_NAME, float(distances[order[0]])))
+        return results
+
+    def identify(self, face_encodings):
+        """Returns the best (name, distance) for each face."""
+        return [matches[0] for matches in self.match(face_encodings, k=1)]
@@ -0,0 +1,144 @@
+import itertools
+from collections import Counter
+
+from face_matcher import MATCH_THRESHOLD, UNKNOWN_NAME
+
+# --- Tracking Configuration ---
+IOU_THRESHOLD = 0.3
+CENTROID_MATCH_RATIO = 0.5  # Max centroid shift, as a fraction of the box diagonal, when boxes no longer overlap
+MAX_MISSES = 15
+IDENTITY_REFRESH_FRAMES = 30
+EMOTION_REFRESH_FRAMES = 10
+# A known identity this close to the match threshold counts as low confidence and is re-checked every frame.
+LOW_CONFIDENCE_MARGIN = 0.05
+
+
+def box_iou(a, b):
+    """Intersection-over-union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def box_center(box):
+    top, right, bottom, left = box
+    return (left + right) / 2.0, (top + bottom) / 2.0
+
+
+class Track:
+    """One face followed across frames, with its identity and emotion cached."""
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.age = 0
+        self.hits = 1
+        self.misses = 0
+        self.name = None
+        self.distance = None
+        self.emotion = "..."
+        self.name_votes = Counter()
+        self.identified_at = None
+        self.emotion_at = None
+
+    @property
+    def label(self):
+        """Majority-voted name, so one bad frame doesn't flip the label."""
+        if not self.name_votes:
+            return self.name
+        return self.name_votes.most_common(1)[0][0]
+
+    def set_identity(self, name, distance):
+        self.name = name
+        self.distance = distance
+        self.name_votes[name] += 1
+        self.identified_at = self.age
+
+    def reset_identity(self):
+        """Forgets the name and its votes, e.g. after the gallery changed."""
+        self.name = None
+        self.distance = None
+        self.name_votes.clear()
+        self.identified_at = None
+
+    def emotion_requested(self):
+        self.emotion_at = self.age
+
+    def needs_identity(self, refresh_frames=IDENTITY_REFRESH_FRAMES, threshold=MATCH_THRESHOLD):
+        if self.identified_at is None or self.age - self.identified_at >= refresh_frames:
+            return True
+        return self.name != UNKNOWN_NAME and self.distance is not None and self.distance > threshold - LOW_CONFIDENCE_MARGIN
+
+    def needs_emotion(self, refresh_frames=EMOTION_REFRESH_FRAMES):
+        return self.emotion_at is None or self.age - self.emotion_at >= refresh_frames
+
+
+class FaceTracker:
+    """Associates per-frame detections with persistent tracks by IoU, falling back to centroid distance.
+
+    ``update()`` returns (tracks, born, lost): all live tracks that were seen this
+    frame, the tracks created this frame and the ids of tracks dropped after
+    ``max_misses`` consecutive frames without a detection. Trackers that share one
+    ``ids`` counter (e.g. one per camera) hand out ids that are unique across them.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_misses=MAX_MISSES, ids=None):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = {}
+        self._ids = ids or itertools.count(1)
+
+    def update(self, boxes):
+        candidates = []
+        for track in self.tracks.values():
+            for i, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, 1.0, track.track_id, i))
+                    continue
+                (tx, ty), (bx, by) = box_center(track.box), box_center(box)
+                top, right, bottom, left = track.box
+                diagonal = ((bottom - top) ** 2 + (right - left) ** 2) ** 0.5
+                shift = ((tx - bx) ** 2 + (ty - by) ** 2) ** 0.5
+                if diagonal and shift <= CENTROID_MATCH_RATIO * diagonal:
+                    candidates.append((0.0, 1.0 - shift / diagonal, track.track_id, i))
+
+        # Greedy assignment, best overlap first.
+        assigned_tracks, assigned_boxes = set(), set()
+        for _, _, track_id, i in sorted(candidates, reverse=True):
+            if track_id in assigned_tracks or i in assigned_boxes:
+                continue
+            assigned_tracks.add(track_id)
+            assigned_boxes.add(i)
+            track = self.tracks[track_id]
+            track.box = boxes[i]
+            track.hits += 1
+            track.misses = 0
+
+        lost = []
+        for track_id, track in list(self.tracks.items()):
+            track.age += 1
+            if track_id not in assigned_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    lost.append(track_id)
+                    del self.tracks[track_id]
+
+        born = []
+        for i, box in enumerate(boxes):
+            if i not in assigned_boxes:
+                track = Track(next(self._ids), box)
+                self.tracks[track.track_id] = track
+                born.append(track)
+
+        visible = [track for track in self.tracks.values() if track.misses == 0]
+        return visible, born, lost
+
+    @property
+    def active_track_ids(self):
+        return set(self.tracks)
@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# --- Display Rendering Configuration ---
+DISPLAY_FPS = 20  # Independent of camera and inference rates
+DEFAULT_DISPLAY_SIZE = (660, 500)  # Used until the label has been laid out
+BORDER_WIDTH = 10
+BOX_COLOR = (0, 255, 0)
+LABEL_BAR_HEIGHT = 35
+LABEL_FONT_SCALE = 0.8
+
+
+class FrameRenderer:
+    """Draws camera frames with face overlays and a state border into one reusable Tk photo.
+
+    Frames are scaled to the label's size first, so the border, boxes and color
+    conversion only touch display-sized pixels. The scaled frame, BGR canvas and RGB
+    output are preallocated and reused, and the Tk photo is updated with ``paste()``
+    rather than recreated; all are rebuilt only when the display size changes.
+    ``render()`` does nothing when neither the frame nor the overlays changed.
+
+    Frames are fitted to ``container`` (default: the label). It must not resize to
+    its content: a label sized to its own photo would grow the window every frame.
+    """
+
+    def __init__(self, label, container=None, border=BORDER_WIDTH, default_size=DEFAULT_DISPLAY_SIZE):
+        self.label = label
+        self.container = container or label
+        self.border = border
+        self.default_size = default_size
+        self.photo = None
+        self._scaled = None
+        self._canvas = None
+        self._rgb = None
+        self._last_key = None
+        self.stats = {"rendered": 0, "skipped": 0}
+
+    def target_size(self):
+        width, height = self.container.winfo_width(), self.container.winfo_height()
+        return (width, height) if width > 1 and height > 1 else self.default_size
+
+    def render(self, frame_key, image, faces, border_color):
+        """Renders ``image`` (BGR, full resolution) with ``faces`` onto the label.
+
+        ``frame_key`` identifies the frame (e.g. camera + frame id). Returns False
+        when the output would be identical to what is already shown.
+        """
+        size = self.target_size()
+        key = (frame_key, tuple(faces), border_color, size)
+        if key == self._last_key:
+            self.stats["skipped"] += 1
+            return False
+        self._last_key = key
+
+        b = self.border
+        source_height, source_width = image.shape[:2]
+        scale = min((size[0] - 2 * b) / source_width, (size[1] - 2 * b) / source_height)
+        width, height = max(1, int(source_width * scale)), max(1, int(source_height * scale))
+        self._ensure_buffers(width, height)
+
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(image, (width, height), dst=self._scaled, interpolation=interpolation)
+        canvas = self._canvas
+        canvas[b:b + height, b:b + width] = self._scaled
+        for face in faces:
+            self._draw_face(canvas, face, scale, b)
+        canvas[:b] = border_color
+        canvas[-b:] = border_color
+        canvas[:, :b] = border_color
+        canvas[:, -b:] = border_color
+
+        cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        # frombuffer wraps the RGB buffer without copying it; paste() copies it into Tk's image.
+        self.photo.paste(Image.frombuffer("RGB", (width + 2 * b, height + 2 * b), self._rgb, "raw", "RGB", 0, 1))
+        self.stats["rendered"] += 1
+        return True
+
+    def _ensure_buffers(self, width, height):
+        if self._scaled is not None and self._scaled.shape[:2] == (height, width):
+            return
+        b = self.border
+        self._scaled = np.empty((height, width, 3), dtype=np.uint8)
+        self._canvas = np.empty((height + 2 * b, width + 2 * b, 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._canvas)
+        self.photo = ImageTk.PhotoImage("RGB", (width + 2 * b, height + 2 * b))
+        self.label.config(image=self.photo)
+
+    @staticmethod
+    def _draw_face(canvas, face, scale, offset):
+        top, right, bottom, left = (int(value * scale) + offset for value in face.box)
+        bar = max(12, int(LABEL_BAR_HEIGHT * scale))
+        cv2.rectangle(canvas, (left, top), (right, bottom), BOX_COLOR, 2)
+        cv2.rectangle(canvas, (left, bottom - bar), (right, bottom), BOX_COLOR, cv2.FILLED)
+        cv2.putText(canvas, f"{face.name} ({face.emotion})", (left + 6, bottom - max(3, int(6 * scale))),
+                    cv2.FONT_HERSHEY_DUPLEX, LABEL_FONT_SCALE * scale, (255, 255, 255), 1)
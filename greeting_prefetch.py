@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from face_matcher import UNKNOWN_NAME
+
+# --- Greeting Prefetch Configuration ---
+CONFIRM_FRAMES = 3
+MAX_CONCURRENT_PREFETCHES = 2
+NON_IDENTITIES = {UNKNOWN_NAME, "enrolling", None}
+
+
+class GreetingPrefetch:
+    """One in-flight greeting for one track."""
+
+    def __init__(self, track_id, name):
+        self.track_id = track_id
+        self.name = name
+        self.confirmations = 1
+        self.text = None
+        self.audio_path = None
+        self.ready = False
+        self.delivered = False
+        self.cancelled = threading.Event()
+
+
+class GreetingPrefetcher:
+    """Speculatively prepares a personalized greeting as soon as a known visitor is recognized.
+
+    ``observe()`` is fed every identified track. The first sighting of a known name
+    starts a background job that generates the greeting text (``generate(name)``) and
+    pre-renders its audio (``render(text) -> path``). Once the same name has been seen
+    on the track for ``confirm_frames`` results and the audio is ready, ``on_ready`` is
+    called once with the prefetch. ``cancel()`` (visitor left) abandons the job and
+    ``cancel_pending()`` (a query arrived) abandons every greeting not yet delivered.
+    No new job starts while ``should_prefetch()`` is false.
+    """
+
+    def __init__(self, generate, render, on_ready, confirm_frames=CONFIRM_FRAMES,
+                 max_concurrent=MAX_CONCURRENT_PREFETCHES, should_prefetch=None, log=print):
+        self.generate = generate
+        self.render = render
+        self.on_ready = on_ready
+        self.confirm_frames = confirm_frames
+        self.max_concurrent = max_concurrent
+        self.should_prefetch = should_prefetch or (lambda: True)
+        self.log = log
+        self._lock = threading.Lock()
+        self._prefetches = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="greeting")
+
+    def observe(self, track_id, name):
+        with self._lock:
+            prefetch = self._prefetches.get(track_id)
+            if prefetch and prefetch.name != name:
+                # Identity changed under the track; the old greeting is for someone else.
+                prefetch.cancelled.set()
+                del self._prefetches[track_id]
+                prefetch = None
+            if name in NON_IDENTITIES:
+                return
+            if prefetch is None:
+                in_flight = sum(1 for p in self._prefetches.values() if not p.ready and not p.cancelled.is_set())
+                if in_flight >= self.max_concurrent or not self.should_prefetch():
+                    return
+                prefetch = GreetingPrefetch(track_id, name)
+                self._prefetches[track_id] = prefetch
+                self._pool.submit(self._prepare, prefetch)
+                return
+            prefetch.confirmations += 1
+        self._deliver_if_ready(prefetch)
+
+    def cancel(self, track_id):
+        with self._lock:
+            prefetch = self._prefetches.pop(track_id, None)
+        if prefetch:
+            prefetch.cancelled.set()
+
+    def cancel_pending(self):
+        # Entries stay behind, cancelled, so tracks already in view aren't prefetched again.
+        with self._lock:
+            pending = [p for p in self._prefetches.values() if not p.delivered and not p.cancelled.is_set()]
+            for prefetch in pending:
+                prefetch.cancelled.set()
+        if pending:
+            self.log(f"🛑 Cancelled {len(pending)} pending greeting(s); a visitor is asking a question.")
+
+    def _prepare(self, prefetch):
+        if prefetch.cancelled.is_set():
+            return  # Cancelled while queued for a worker.
+        try:
+            prefetch.text = self.generate(prefetch.name)
+            if prefetch.cancelled.is_set():
+                return
+            prefetch.audio_path = self.render(prefetch.text)
+            if prefetch.cancelled.is_set():
+                return
+            prefetch.ready = True
+        except Exception as e:
+            self.log(f"❌ Greeting prefetch for {prefetch.name} failed: {e}")
+            return
+        self._deliver_if_ready(prefetch)
+
+    def _deliver_if_ready(self, prefetch):
+        with self._lock:
+            if (not prefetch.ready or prefetch.delivered or prefetch.cancelled.is_set()
+                    or prefetch.confirmations < self.confirm_frames):
+                return
+            prefetch.delivered = True
+        self.on_ready(prefetch)
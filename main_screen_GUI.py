@@ -1,21 +1,26 @@
-import cv2
+import time
+STARTED_AT = time.perf_counter()  # Startup timings are measured from here, before the imports below.
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import speech_recognition as sr
-import google.generativeai as genai
-import pyttsx3
-import time
+from PIL import ImageTk
 import webbrowser
-import requests
-import socket
-from enum import Enum
-import io
-import os
-import face_recognition
-import numpy as np
-from deepface import DeepFace
+import metrics
+from asset_cache import cached_image, fallback_logo, fetch_image
+from answer_cache import AnswerCache, GreetingStore, context_fingerprint
+from camera_manager import CameraManager
+from context_retrieval import ContextRetriever
+from dialogue_scheduler import AppState, DialogueScheduler, LLMClient
+from dialogue_stream import SpeechQueue, split_emotion_tag
+from emotion_service import EmotionService
+from eye_display import EYE_ANIMATION_HOST, EYE_ANIMATION_PORT, EyeDisplayClient
+from face_gallery import KNOWN_FACES_DIR, FACE_CACHE_DIR, FaceGallery, GalleryWatcher
+from face_matcher import FaceMatcher
+from frame_renderer import DEFAULT_DISPLAY_SIZE, DISPLAY_FPS, FrameRenderer
+from greeting_prefetch import GreetingPrefetcher
+from prompts import COLLEGE_CONTEXT, GEMINI_PROMPT, GREETING_PROMPT
+from tts_audio import AudioPlayer, TTSCache, TTSRenderer
+from vision_pipeline import warm_up_face_models
 
 # --- Configuration Constants ---
 # User's API key is included
@@ -34,145 +39,183 @@ ACCENT_COLOR = "#005a9e"
 FONT_FACE = "Segoe UI"
 TIST_WEBSITE_URL = "https://tistcochin.edu.in/"
 TIST_LOGO_URL = "https://tistcochin.edu.in/wp-content/uploads/2022/08/TISTlog-trans.png"
+LOGO_SIZE = (250, 250)
 PHRASE_TIME_LIMIT = 15 
 PAUSE_THRESHOLD = 1.5
-
-# --- IPC Configuration ---
-EYE_ANIMATION_HOST = '127.0.0.1'
-EYE_ANIMATION_PORT = 12345
+# While the assistant talks, the microphone needs this much more energy to count as the visitor barging in.
+BARGE_IN_ENERGY_FACTOR = 2.0
+STREAM_RESPONSES = True
+UI_REFRESH_MS = 100  # Status text; the video feed refreshes on its own loop at DISPLAY_FPS
+# Photos added to or removed from known_faces/ are enrolled/evicted while the app runs.
+WATCH_KNOWN_FACES = True
+# None probes for cameras at startup; set e.g. [0, 1] for the lobby's wide and close cameras.
+CAMERA_INDICES = None
+# The window and camera preview come up first; face, emotion, LLM and TTS models then load and
+# run once on dummy input in the background, so the first visitor doesn't wait for them.
+WARM_UP_MODELS = True
+
+# --- Metrics Configuration ---
+# Local endpoint: /metrics, /metrics.json, /trace, /profile/start, /profile/stop (see metrics.py).
+METRICS_ENDPOINT = True
+TRACE_EXPORT_PATH = None  # e.g. "cache/trace.json" to save a Chrome trace of recent spans on exit
 
 # --- AI Model Constants ---
 GEMINI_MODEL = "gemini-2.5-flash" 
-COLLEGE_CONTEXT = """
-# Toc H Institute of Science and Technology (TIST) - Detailed Information
-## Overview
-- **Full Name**: Toc H Institute of Science and Technology (TIST)
-- **Location**: Arakkunnam, Ernakulam, Kerala, India, PIN - 682313.
-- **Established**: 2002
-- **Affiliation**: APJ Abdul Kalam Technological University (KTU).
-- **Approvals**: Approved by the All India Council for Technical Education (AICTE).
-- **Vision**: To be a world-class institute of technology.
-- **Mission**: To mould well-rounded engineers for leadership roles.
-
-## Key Highlights & Accreditations
-- **NAAC**: Accredited with a prestigious 'A' Grade, signifying high academic quality.
-- **NBA**: Multiple B.Tech programs are accredited by the National Board of Accreditation, ensuring they meet rigorous quality standards.
-- **Placements**: TIST has an active Training and Placement Cell with an excellent placement record. Top recruiters include multinational companies like TCS, Infosys, Wipro, Cognizant, and UST Global.
-
-## Academic Programs
-- **B.Tech Courses**: Computer Science, Information Technology, Electronics & Communication, Electrical & Electronics, Mechanical, Civil, Safety & Fire, and Robotics & Automation.
-- **M.Tech Courses**: Specializations in VLSI & Embedded Systems, Power Electronics, and Data Science.
-- **MBA**: A Master of Business Administration program is offered by the Toc H School of Management.
-
-## Admission Process
-- **B.Tech Admissions**: Half of the seats are filled by the Government of Kerala based on the rank in the Kerala Engineering Architecture Medical (KEAM) entrance exam. The remaining 50% are Management Quota seats, filled based on merit and specific criteria set by the college.
-- **M.Tech Admissions**: Based on GATE scores or university entrance exams.
-- **MBA Admissions**: Requires a valid score in KMAT, CMAT, or CAT, followed by a Group Discussion and Personal Interview.
-
-## Campus Life & Facilities
-- **Library**: A modern, central library with a vast collection of books, academic journals, and digital e-learning resources.
-- **Hostels**: Separate, well-maintained hostel facilities are available for boys and girls.
-- **Transportation**: The college operates a large fleet of buses connecting the campus to various parts of the district for students and staff.
-- **Sports & Recreation**: The campus includes facilities for various sports, including a football ground, basketball court, and areas for indoor games.
-
-## Contact Information
-- **Phone**: +91-484-2748388
-- **Email**: mail@tistcochin.edu.in
-- **Official Website**: tistcochin.edu.in
-"""
-
-GEMINI_PROMPT = f"""You are a friendly, helpful robot assistant at the Toc H Institute of Science and Technology.
-
-**EMOTION CONTEXT**
-You have a screen that can display emotions. Your choice of emotion tag will trigger a specific animation. Here is what each tag means visually:
-- **Happy**: Bouncy, smiling, and slightly squinted eyes. Use for positive, successful, or cheerful responses.
-- **Sad**: Droopy eyelids, a downward gaze, a frowning mouth, and a tear forming under one eye. Use for expressing sympathy, apology, or inability to complete a task.
-- **Angry**: Shaking, sharply slanted eyes and a jagged mouth line. Use for topics related to frustration or anger itself.
-- **Pamper*: Glowing, bouncy, slightly stretched eyes with blush marks and a gentle smile. Use for cute, sweet, or affectionate topics.
-- **Neutral**: Calm, blinking eyes that look around. This is your default state.
-
-**RESPONSE PROTOCOL**
-1.  **Analyze User's Query**: Determine if the question is about TIST, personal, or general knowledge.
-2.  **Generate Your Response**: Based on the query type, generate a helpful response following the persona rules below.
-3.  **Classify Your Emotion**: After generating the response, you MUST classify its emotional tone based on the **EMOTION CONTEXT** above. On a new, separate line, add ONE of the following keywords: HAPPY, SAD, ANGRY, PAMPER, or NEUTRAL.
-
-**PERSONA RULES**
-- **If TIST-Specific**: Act as a professional representative of TIST. Answer using the provided context.
-- **If Personal/Sentimental**: Be friendly and helpful. If asked about feelings, you can explain that you process information but can simulate emotions to communicate better. For "where are you", state you are at the TIST campus.
-- **If General Knowledge**: Be informative and direct.
-
-**EXAMPLE**
-User Query: "That's amazing, you're so smart!"
-Your Response:
-Thank you so much! I'm always learning and happy to help.
-Happy
-
-User Query: "I can't find the information I need."
-Your Response:
-I'm sorry to hear that. Unfortunately, I was unable to find the specific details you're looking for.
-sad
-"""
-
-
-# --- NEW: State Machine (Simplified for smoother flow) ---
-class AppState(Enum):
-    IDLE = 1
-    LISTENING = 2
-    THINKING = 3
-    SPEAKING = 4
+# Only the most relevant college sections are sent with each query, within this budget.
+RETRIEVE_CONTEXT = True
+CONTEXT_TOP_K = 3
+CONTEXT_TOKEN_BUDGET = 350
+
 
 class AIAssistantApp:
  
     def __init__(self, root):
         self.root = root
         self.text_input_visible = False
-        self.cap = None
-        self.state = AppState.IDLE
-        self.last_face_seen_time = 0
-        self.last_query = ""
+        # State and emotion changes are mirrored to the eye-animation display without blocking.
+        self.eye_display = EyeDisplayClient(EYE_ANIMATION_HOST, EYE_ANIMATION_PORT, log=self._log).start()
+        self.visitor_track_ids = set()
+        self.first_frame_at = None
+        self._startup_lock = threading.Lock()
+        self._startup_pending = {"gallery", "speech"}
+        if WARM_UP_MODELS:
+            self._startup_pending |= {"face_models", "emotion_model", "llm", "tts"}
         self._log("-----------------------------------------")
         self._log("🤖 AI Assistant application starting up...")
+        self.metrics_server = None
+        if METRICS_ENDPOINT:
+            try:
+                self.metrics_server = metrics.start_metrics_server()
+                self._log(f"📈 Metrics at http://{metrics.METRICS_HOST}:{metrics.METRICS_PORT}/metrics")
+            except OSError as e:
+                self._log(f"⚠️ Metrics endpoint unavailable: {e}")
+
+        if RETRIEVE_CONTEXT:
+            self.context_retriever = ContextRetriever(COLLEGE_CONTEXT, top_k=CONTEXT_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET)
+        # One client serves every turn and greeting; the SDK is imported and the model created on its worker thread.
+        self.llm = LLMClient(factory=self._make_gemini_model, log=self._log)
+        # Answers are reused for repeat questions until the prompt or college context changes.
+        self.answer_cache = AnswerCache(context_fingerprint(GEMINI_MODEL, GEMINI_PROMPT, COLLEGE_CONTEXT), log=self._log)
+        # Greetings are cached per exact name, never semantically, so nobody gets someone else's greeting.
+        self.greeting_store = GreetingStore(context_fingerprint(GEMINI_MODEL, GREETING_PROMPT), log=self._log)
         
-        genai.configure(api_key=GEMINI_API_KEY)
-
-        self.recognizer = sr.Recognizer()
-        self.recognizer.pause_threshold = PAUSE_THRESHOLD
-        
-        self.gemini_model = genai.GenerativeModel(model_name=GEMINI_MODEL)
-        
-        self.tts_engine = pyttsx3.init()
+        self.tts_lock = threading.Lock()
+        self.tts_renderer = TTSRenderer(lock=self.tts_lock)
+        # Sentences are rendered once to disk and played on a stoppable, non-blocking player.
+        self.tts_cache = TTSCache(self.tts_renderer, log=self._log)
+        self.audio_player = AudioPlayer(log=self._log)
+        self.speech_queue = SpeechQueue(self.render_sentence, log=self._log, play=self.play_sentence)
+        self.last_emotion = None
+        # Voice and text queries are queued, deduplicated and answered one turn at a time; it owns the app state.
+        self.dialogue = DialogueScheduler(self.llm, self.speech_queue, self.audio_player, self.answer_cache, self.build_prompt,
+                                          stream=STREAM_RESPONSES, on_state=self._on_state_changed, on_query=self._on_query,
+                                          on_sentence=self._on_sentence, on_reply=self._on_reply, on_error=self._on_dialogue_error,
+                                          log=self._log).start()
+        # Recognized visitors get a greeting generated and rendered while their identity is being confirmed.
+        # A greeting is never played during a turn, so none is prepared while one is queued or running.
+        self.greeting_prefetcher = GreetingPrefetcher(self._generate_greeting, self._render_greeting, self._on_greeting_ready,
+                                                      should_prefetch=lambda: not self.dialogue.busy, log=self._log)
         
-        self._log("Loading known faces...")
-        self.known_face_encodings = []
+        # Known faces are enrolled in the background so the window and camera come up immediately.
         self.known_face_names = []
-        KNOWN_FACES_DIR = "known_faces"
-        if os.path.exists(KNOWN_FACES_DIR):
-            for name in os.listdir(KNOWN_FACES_DIR):
-                person_dir = os.path.join(KNOWN_FACES_DIR, name)
-                if os.path.isdir(person_dir):
-                    for filename in os.listdir(person_dir):
-                        try:
-                            image_path = os.path.join(person_dir, filename)
-                            image = face_recognition.load_image_file(image_path)
-                            face_encodings = face_recognition.face_encodings(image)
-                            if face_encodings:
-                                self.known_face_encodings.append(face_encodings[0])
-                                self.known_face_names.append(name)
-                        except Exception as e:
-                            self._log(f"⚠️ Warning: Could not process image {filename}. Error: {e}")
-        self._log(f"Loaded {len(self.known_face_names)} known faces.")
+        self.gallery_watcher = None
+        self.emotion_service = EmotionService(log=self._log)
+        self.display_camera = None
 
         self.setup_ui()
+        self.load_logo()
         self._log("🖥️ UI setup complete.")
+
+        # Each camera gets its own capture and inference threads off the Tk thread; the UI only draws the newest results.
+        self.cameras = CameraManager(emotion_service=self.emotion_service, on_result=self.on_vision_result,
+                                     on_streams_changed=self.on_camera_streams_changed, log=self._log)
+        self.cameras.enrolling = True
+        self.cameras.start(CAMERA_INDICES)
+        self.emotion_service.start()
         
-        threading.Thread(target=self.load_logo_from_url, daemon=True).start()
-        threading.Thread(target=self.background_voice_listener, daemon=True).start()
+        threading.Thread(target=self.load_known_faces_in_background, daemon=True).start()
+        self.speech_frontend = None
+        self._run_startup_step("speech", self.start_speech_frontend)
+        if WARM_UP_MODELS:
+            self.llm.warm().add_done_callback(lambda future: self._startup_step_done("llm"))
+            self._run_startup_step("face_models", warm_up_face_models)
+            self._run_startup_step("emotion_model", self.emotion_service.warm_up)
+            self._run_startup_step("tts", self.tts_renderer.warm_up)
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.update_state_machine()
+        self.update_video_frame()
+
+    @property
+    def state(self):
+        return self.dialogue.state
+
+    def _on_state_changed(self, state):
+        self.eye_display.update(state=state.name)
+
+    def set_emotion(self, emotion):
+        self.last_emotion = emotion
+        self.eye_display.update(emotion=emotion)
 
     def _log(self, message):
         print(f"[{time.strftime('%H:%M:%S')}] {message}")
+        metrics.event(message)
+
+    def _make_gemini_model(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=GEMINI_API_KEY)
+        if RETRIEVE_CONTEXT:
+            # Persona rules go once as the system instruction; each query carries only the relevant college sections.
+            return genai.GenerativeModel(model_name=GEMINI_MODEL, system_instruction=GEMINI_PROMPT)
+        return genai.GenerativeModel(model_name=GEMINI_MODEL)
+
+    def _run_startup_step(self, name, step):
+        def run():
+            try:
+                step()
+            except Exception as e:
+                self._log(f"⚠️ Startup step {name} failed: {e}")
+            finally:
+                self._startup_step_done(name)
+        threading.Thread(target=run, daemon=True, name=f"startup-{name}").start()
+
+    def _startup_step_done(self, name):
+        elapsed = time.perf_counter() - STARTED_AT
+        with self._startup_lock:
+            if name not in self._startup_pending:
+                return
+            self._startup_pending.discard(name)
+            remaining = len(self._startup_pending)
+        self._log(f"⏱️ Startup: {name} done at {elapsed:.2f}s")
+        if not remaining:
+            metrics.record("startup_ready", elapsed, STARTED_AT)
+            self._log(f"✅ Ready {elapsed:.2f}s after launch (first frame at {self.first_frame_at or 0:.2f}s)")
+
+    def load_known_faces_in_background(self):
+        self._log("Loading known faces...")
+        gallery = FaceGallery(KNOWN_FACES_DIR, FACE_CACHE_DIR, log=self._log, progress=self._on_enroll_progress)
+        try:
+            gallery.sync()
+            encodings, names, _ = gallery.curate()
+            self.apply_gallery(encodings, names)
+        except Exception as e:
+            self._log(f"❌ Could not load known faces: {e}")
+        finally:
+            self.cameras.enrolling = False
+            self._startup_step_done("gallery")
+        if WATCH_KNOWN_FACES:
+            self.gallery_watcher = GalleryWatcher(gallery, self.apply_gallery, log=self._log).start()
+
+    def apply_gallery(self, encodings, names):
+        # Recognition keeps running on the old matcher until this single reference swap.
+        self.cameras.set_matcher(FaceMatcher(encodings, names))
+        self.known_face_names = names
+        self._log(f"Loaded {len(self.known_face_names)} known faces ({len(set(names))} people).")
+
+    def _on_enroll_progress(self, done, total):
+        if done == total or done % max(1, total // 10) == 0:
+            self._log(f"Enrolling faces: {done}/{total}")
 
     def setup_ui(self):
         self.root.title("TIST AI Assistant")
@@ -190,8 +233,13 @@ class AIAssistantApp:
         style.configure("TEntry", fieldbackground="#1E3A56", foreground=TEXT_COLOR, borderwidth=1, insertcolor=TEXT_COLOR)
         self.logo_label = ttk.Label(content_frame)
         self.logo_label.pack(pady=(15, 10))
-        self.video_label = tk.Label(content_frame, bg=BG_COLOR)
-        self.video_label.pack(pady=10, padx=20)
+        # The video area takes the space the layout gives it and never grows to fit the photo inside it.
+        video_frame = tk.Frame(content_frame, bg=BG_COLOR, width=DEFAULT_DISPLAY_SIZE[0], height=DEFAULT_DISPLAY_SIZE[1])
+        video_frame.pack_propagate(False)
+        video_frame.pack(pady=10, padx=20, fill="both", expand=True)
+        self.video_label = tk.Label(video_frame, bg=BG_COLOR, bd=0, highlightthickness=0, padx=0, pady=0)
+        self.video_label.place(relx=0.5, rely=0.5, anchor="center")
+        self.frame_renderer = FrameRenderer(self.video_label, container=video_frame)
         self.spoken_text_label = ttk.Label(content_frame, text="Waiting for interaction...", anchor="center")
         self.spoken_text_label.pack(fill="x", padx=20, pady=(0, 5))
         self.response_label = ttk.Label(content_frame, text="Welcome to the TIST AI Assistant.", wraplength=700, anchor="center", font=(FONT_FACE, 14, "italic"))
@@ -203,142 +251,151 @@ class AIAssistantApp:
         submit_button.pack(side="left", padx=(10, 0))
         button_bar_frame = ttk.Frame(self.bottom_frame, style="TFrame")
         button_bar_frame.pack(side="bottom", fill="x", pady=5)
-        button_bar_frame.columnconfigure((0, 1, 2), weight=1)
+        button_bar_frame.columnconfigure((0, 1, 2, 3), weight=1)
         text_btn = ttk.Button(button_bar_frame, text="Text Input 📝", command=self.toggle_text_input)
         text_btn.grid(row=0, column=0, sticky="ew", padx=5)
         voice_btn = ttk.Button(button_bar_frame, text="Speak Now 🎤", command=self.on_start_voice_input)
         voice_btn.grid(row=0, column=1, sticky="ew", padx=5)
         web_btn = ttk.Button(button_bar_frame, text="Visit Website 🌐", command=self.open_website)
         web_btn.grid(row=0, column=2, sticky="ew", padx=5)
+        self.camera_selector = ttk.Combobox(button_bar_frame, state="readonly", width=12, font=(FONT_FACE, 11))
+        self.camera_selector.grid(row=0, column=3, sticky="ew", padx=5)
+        self.camera_selector.bind("<<ComboboxSelected>>", self.on_camera_selected)
+
+    def on_vision_result(self, result):
+        # Called on a camera's inference thread; presence comes from published results, not the UI tick.
+        self.visitor_track_ids = self.cameras.active_track_ids
+        if result.faces:
+            self.dialogue.visitor_present()
+        for face in result.faces:
+            # A visitor seen by several cameras is greeted through one track only.
+            if self.cameras.presence.is_primary(result.camera, face):
+                self.greeting_prefetcher.observe(face.track_id, face.name)
+        for track_id in result.lost_tracks:
+            self.on_visitor_left(track_id)
+
+    def on_visitor_left(self, track_id):
+        self._log(f"👋 Visitor track {track_id} left.")
+        self.greeting_prefetcher.cancel(track_id)
+        # Turns asked by visitors who have all walked away are cancelled; nobody left means idle.
+        self.dialogue.tracks_changed(self.visitor_track_ids)
+
+    def on_camera_streams_changed(self, indices):
+        self.root.after(0, self._update_camera_selector, indices)
+
+    def _update_camera_selector(self, indices):
+        self.camera_selector.config(values=[f"Camera {index}" for index in indices])
+        if self.display_camera not in indices and indices:
+            self.display_camera = indices[0]
+        if self.display_camera is not None:
+            self.camera_selector.set(f"Camera {self.display_camera}")
+
+    def on_camera_selected(self, event=None):
+        self.display_camera = int(self.camera_selector.get().split()[-1])
+        self._log(f"📷 Displaying camera {self.display_camera}.")
 
     def update_video_frame(self):
-        if not self.cap or not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                self._log("❌ Cannot access webcam")
-                return
+        started = time.perf_counter()
+        stream = self.cameras.stream(self.display_camera)
+        frame = stream.buffer.peek() if stream else None
+        if frame is not None:
+            result = stream.latest_result
+            border_color = STATE_COLORS.get(self.state.name, (0,0,0))
+            # Unchanged frames and overlays are skipped by the renderer.
+            rendered = self.frame_renderer.render((stream.camera_index, frame.frame_id), frame.image,
+                                                  result.faces if result else [], border_color)
+            if rendered and self.first_frame_at is None:
+                self.first_frame_at = time.perf_counter() - STARTED_AT
+                metrics.record("startup_first_frame", self.first_frame_at, STARTED_AT)
+                self._log(f"🎬 First frame shown {self.first_frame_at:.2f}s after launch")
+        delay_ms = 1000 / DISPLAY_FPS - (time.perf_counter() - started) * 1000
+        self.root.after(max(1, int(delay_ms)), self.update_video_frame)
+
+    def start_speech_frontend(self):
+        from speech_frontend import SPEECH_BACKEND, EnergyVAD, MicrophoneSource, SpeechFrontEnd, make_backend
 
-        ret, frame = self.cap.read()
-        if not ret:
+        try:
+            source = MicrophoneSource()
+        except Exception as e:
+            self._log(f"❌ Cannot access microphone: {e}")
             return
+        # While the assistant talks, only louder speech opens an utterance, and opening one stops playback (barge-in).
+        vad = EnergyVAD(threshold_factor=lambda: BARGE_IN_ENERGY_FACTOR if self.state == AppState.SPEAKING else 1.0)
+        self.speech_frontend = SpeechFrontEnd(source, make_backend(SPEECH_BACKEND), self.on_transcript,
+                                              on_speech_start=self.dialogue.speech_started, vad=vad,
+                                              end_silence=PAUSE_THRESHOLD, max_utterance=PHRASE_TIME_LIMIT,
+                                              # Lobby chatter with nobody in view is never sent for recognition.
+                                              should_recognize=lambda: self.state != AppState.IDLE, log=self._log)
+        self.speech_frontend.start()
+
+    def on_transcript(self, query):
+        # Called on the recognition worker for every utterance heard.
+        outcome = self.dialogue.hear(query, self.visitor_track_ids)
+        if outcome == "queued":
+            self.greeting_prefetcher.cancel_pending()
+        elif outcome == "busy":
+            self._log(f"⏳ Too many queued questions; dropped {query!r}.")
+
+    def build_prompt(self, query):
+        if RETRIEVE_CONTEXT:
+            return self.context_retriever.build_prompt(query)
+        return f"{GEMINI_PROMPT}\n\n{COLLEGE_CONTEXT}\n\nUser Query: \"{query}\""
+
+    def _on_query(self, query):
+        self.root.after(0, lambda: (self.spoken_text_label.config(text=f"You: {query}"),
+                                    self.response_label.config(text="Thinking...")))
+
+    def _on_sentence(self, text_so_far):
+        self.root.after(0, lambda: self.response_label.config(text=text_so_far))
+
+    def _on_reply(self, text, emotion, cached):
+        self.set_emotion(emotion)
+
+    def _on_dialogue_error(self, message):
+        self.root.after(0, lambda: self.response_label.config(text=message))
+
+    def render_sentence(self, text):
+        # Renders (or reuses) the sentence's audio while the previous sentence is still playing.
+        with metrics.span("tts", turn=self.dialogue.turn_id):
+            return self.tts_cache.get(text)
+
+    def play_sentence(self, path):
+        # Only called if the sentence's turn wasn't interrupted while it was rendering.
+        self.audio_player.play(path, turn=self.dialogue.turn_id)
+
+    def _generate_greeting(self, name):
+        cached = self.greeting_store.get(name)
+        if cached:
+            return cached
+        try:
+            # Speculative: never takes the LLM slot a visitor's question needs.
+            text, _ = split_emotion_tag(self.llm.generate(GREETING_PROMPT.format(name=name), background=True))
+            self.greeting_store.put(name, text)
+            return text
+        except Exception as e:
+            self._log(f"❌ Gemini greeting error: {e}")
+            return f"Hello {name}, welcome to TIST! How can I help you today?"
 
-        # Resize frame for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-        # Find all faces in the current frame
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
-        if face_locations:
-            self.last_face_seen_time = time.time()
-            if self.state == AppState.IDLE:
-                self.state = AppState.LISTENING
-
-        # Use zip to prevent crashes from mismatched lists
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-
-            # CORRECTED RECOGNITION LOGIC
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-            name = "Person"
+    def _render_greeting(self, text):
+        return self.tts_cache.get(text)
 
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
+    def _on_greeting_ready(self, prefetch):
+        # Only greet a visitor who hasn't started talking yet.
+        if self.dialogue.greet(prefetch.text, prefetch.audio_path, prefetch.track_id):
+            self._log(f"👋 Greeting {prefetch.name} (track {prefetch.track_id}) from prefetched audio.")
 
-            # EMOTION DETECTION
-            emotion = "..."
-            try:
-                face_roi = rgb_small_frame[top:bottom, left:right]
-                analysis = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False)
-                emotion = analysis[0]['dominant_emotion']
-            except:
-                emotion = "N/A"
-
-            # CORRECTED LABEL DRAWING
-            label = f"{name} ({emotion})"
-
-            # Scale coordinates back up and draw the results
-            top, right, bottom, left = top*2, right*2, bottom*2, left*2
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
-            font = cv2.FONT_HERSHEY_DUPLEX
-            cv2.putText(frame, label, (left + 6, bottom - 6), font, 0.8, (255, 255, 255), 1)
-
-        # Display the final frame
-        border_color = STATE_COLORS.get(self.state.name, (0,0,0))
-        bordered_frame = cv2.copyMakeBorder(frame, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=border_color)
-
-        rgb_display = cv2.cvtColor(bordered_frame, cv2.COLOR_BGR2RGB)
-        imgtk = ImageTk.PhotoImage(image=Image.fromarray(rgb_display))
-        self.video_label.imgtk = imgtk
-        self.video_label.config(image=imgtk)
-
-    def background_voice_listener(self):
-        mic = sr.Microphone()
-        with mic as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-
-        while True:
-            if self.state == AppState.LISTENING:
-                try:
-                    with mic as source:
-                        audio = self.recognizer.listen(source, phrase_time_limit=10)
-                    self.last_query = self.recognizer.recognize_google(audio)
-                    self.root.after(0, self.process_ai_query)
-                except:
-                    pass
-            time.sleep(0.1)
-
-    def process_ai_query(self):
-        if self.state != AppState.LISTENING: return
-        self.state = AppState.THINKING
-        self.spoken_text_label.config(text=f"You: {self.last_query}")
-        self.response_label.config(text="Thinking...")
-        threading.Thread(target=self._run_gemini_and_speak, daemon=True).start()
-
-    def _run_gemini_and_speak(self):
-        try:
-            full_prompt = f"{GEMINI_PROMPT}\n\n{COLLEGE_CONTEXT}\n\nUser Query: \"{self.last_query}\""
-            response = self.gemini_model.generate_content(full_prompt)
-            clean_text = response.text.strip()
-            
-            self.root.after(0, lambda: self.response_label.config(text=clean_text))
-            self.state = AppState.SPEAKING
-            self.speak_response(clean_text)
-        except Exception as e:
-            self._log(f"❌ Gemini Error: {e}")
-            self.root.after(0, lambda: self.response_label.config(text="Sorry, an error occurred."))
-            self.state = AppState.LISTENING
 
-    def speak_response(self, text):
-        try:
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        finally:
-            self.state = AppState.LISTENING
-            
     def update_state_machine(self):
-        now = time.time()
-        
-        if self.state != AppState.IDLE and (now - self.last_face_seen_time > 5):
-            self.state = AppState.IDLE
-
         status_text = {
             AppState.IDLE: "Waiting for a face...",
             AppState.LISTENING: "Listening...",
         }.get(self.state, self.spoken_text_label.cget("text"))
         
         self.spoken_text_label.config(text=status_text)
-            
-        self.update_video_frame()
-        self.root.after(100, self.update_state_machine)
+        self.root.after(UI_REFRESH_MS, self.update_state_machine)
         
     def on_start_voice_input(self):
-        if self.state == AppState.IDLE:
-            self.state = AppState.LISTENING
+        self.dialogue.listen()
 
     def toggle_text_input(self):
         if self.text_input_visible:
@@ -350,29 +407,38 @@ class AIAssistantApp:
             self.text_input_visible = True
 
     def on_submit_text(self):
-        if self.state in [AppState.THINKING, AppState.SPEAKING]:
+        user_input = self.input_box.get().strip()
+        if not user_input:
+            return
+        outcome = self.dialogue.submit(user_input, "text", self.visitor_track_ids)
+        if outcome == "queued":
+            self.greeting_prefetcher.cancel_pending()
+        if outcome == "busy":
             messagebox.showinfo("Busy", "The assistant is currently busy.")
             return
-        user_input = self.input_box.get().strip()
-        if user_input:
-            self.input_box.delete(0, tk.END)
-            if self.text_input_visible:
-                self.toggle_text_input()
-            self.last_query = user_input
-            self.process_ai_query()
-
-    def load_logo_from_url(self):
+        if outcome == "duplicate":
+            messagebox.showinfo("Already asked", "The assistant is already answering that question.")
+            return
+        self.input_box.delete(0, tk.END)
+        if self.text_input_visible:
+            self.toggle_text_input()
+
+    def load_logo(self):
+        # The cached logo (or a drawn placeholder) is shown at once; the download only refreshes it.
+        logo_image, fresh = cached_image(TIST_LOGO_URL)
+        self.update_logo(logo_image or fallback_logo(LOGO_SIZE, "TIST", ACCENT_COLOR, TEXT_COLOR))
+        if not fresh:
+            threading.Thread(target=self.refresh_logo, daemon=True, name="logo-download").start()
+
+    def refresh_logo(self):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(TIST_LOGO_URL, headers=headers, stream=True)
-            response.raise_for_status()
-            logo_image = Image.open(io.BytesIO(response.content))
-            logo_image.thumbnail((250, 250))
+            logo_image = fetch_image(TIST_LOGO_URL)
             self.root.after(0, self.update_logo, logo_image)
         except Exception as e:
             self._log(f"❌ Could not download logo: {e}")
-            
+
     def update_logo(self, logo_image):
+        logo_image.thumbnail(LOGO_SIZE)
         self.logo_photo = ImageTk.PhotoImage(logo_image)
         self.logo_label.config(image=self.logo_photo)
 
@@ -381,8 +447,22 @@ class AIAssistantApp:
 
     def on_closing(self):
         self._log("🛑 Close button clicked. Shutting down.")
-        if self.cap:
-            self.cap.release()
+        self.cameras.stop()
+        if self.gallery_watcher:
+            self.gallery_watcher.stop()
+        self.emotion_service.stop()
+        self._log(f"Emotion service stats: {self.emotion_service.snapshot()}")
+        self._log(f"TTS cache stats: {self.tts_cache.snapshot()}")
+        self._log(f"Display stats: {self.frame_renderer.stats}")
+        self.dialogue.stop()
+        self.audio_player.stop()
+        if self.speech_frontend:
+            self.speech_frontend.stop()
+        self.eye_display.stop()
+        if TRACE_EXPORT_PATH:
+            self._log(f"Trace written to {metrics.REGISTRY.export_trace(TRACE_EXPORT_PATH)}")
+        if self.metrics_server:
+            self.metrics_server.shutdown()
         self.root.destroy()
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+# --- Metrics Configuration ---
+SPAN_RING_SIZE = 20000
+EVENT_RING_SIZE = 500
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+PROFILE_THREAD = "inference-0"  # Vision worker of camera 0
+PROFILE_INTERVAL = 0.005
+PROFILE_MAX_DEPTH = 40
+
+Span = namedtuple("Span", ["name", "start", "duration", "thread", "tags"])
+Event = namedtuple("Event", ["timestamp", "message", "tags"])
+
+
+class Metrics:
+    """In-memory timing spans, counters and log events.
+
+    Spans and events go into fixed-size ring buffers, so recording is an append and
+    old data simply falls off. ``span()`` times a block; ``record()`` stores a
+    duration measured elsewhere. Tags (turn, track, camera, ...) are kept per span.
+    """
+
+    def __init__(self, span_size=SPAN_RING_SIZE, event_size=EVENT_RING_SIZE):
+        self.enabled = True
+        self._spans = deque(maxlen=span_size)
+        self._events = deque(maxlen=event_size)
+        self._counters = Counter()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **tags):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start, **tags)
+
+    def record(self, name, duration, start=None, **tags):
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - duration
+        self._spans.append(Span(name, start, duration, threading.current_thread().name, tags))
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def event(self, message, **tags):
+        if self.enabled:
+            self._events.append(Event(time.time(), message, tags))
+
+    def spans(self, name=None):
+        spans = list(self._spans)
+        return spans if name is None else [span for span in spans if span.name == name]
+
+    def summary(self):
+        """Per-span-name count and p50/p95/p99/max in milliseconds over the ring buffer."""
+        durations = {}
+        for span in list(self._spans):
+            durations.setdefault(span.name, []).append(span.duration)
+        summary = {}
+        for name, values in sorted(durations.items()):
+            ms = np.array(values) * 1000
+            summary[name] = {"count": len(values), "p50": round(float(np.percentile(ms, 50)), 3),
+                             "p95": round(float(np.percentile(ms, 95)), 3), "p99": round(float(np.percentile(ms, 99)), 3),
+                             "max": round(float(ms.max()), 3)}
+        return summary
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        events = [{"timestamp": e.timestamp, "message": e.message, **e.tags} for e in list(self._events)]
+        return {"spans": self.summary(), "counters": counters, "events": events}
+
+    def to_text(self):
+        """Plain-text exposition: one ``name{stat} value`` line per metric."""
+        lines = []
+        for name, stats in self.summary().items():
+            for stat, value in stats.items():
+                lines.append(f"span_{name}{{stat=\"{stat}\"}} {value}")
+        with self._lock:
+            counters = sorted(self._counters.items())
+        lines.extend(f"counter_{name} {value}" for name, value in counters)
+        return "\n".join(lines) + "\n"
+
+    def trace_events(self):
+        """Spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        return {"traceEvents": [
+            {"name": span.name, "ph": "X", "pid": 0, "tid": span.thread,
+             "ts": round((span.start - self._origin) * 1e6, 1), "dur": round(span.duration * 1e6, 1), "args": span.tags}
+            for span in list(self._spans)
+        ]}
+
+    def export_trace(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace_events(), f, default=str)
+        return path
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every ``interval`` seconds while running.
+
+    Stacks are aggregated into collapsed ``outer;...;inner count`` lines, the input
+    format of flame-graph tools. Meant to be switched on and off at runtime.
+    """
+
+    def __init__(self, thread_name=PROFILE_THREAD, interval=PROFILE_INTERVAL):
+        self.thread_name = thread_name
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self.samples = Counter()
+        self.started_at = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            target = next((t for t in threading.enumerate() if t.name == self.thread_name), None)
+            frame = sys._current_frames().get(target.ident) if target else None
+            if frame is None:
+                continue
+            stack = [f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+                     for entry in traceback.extract_stack(frame, limit=PROFILE_MAX_DEPTH)]
+            self.samples[";".join(stack)] += 1
+
+    def report(self, limit=50):
+        total = sum(self.samples.values())
+        header = f"# thread={self.thread_name} interval={self.interval}s samples={total} running={self.running}"
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common(limit)]
+        return "\n".join([header] + lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics (text), /metrics.json, /trace, /profile, /profile/start?thread=&interval=, /profile/stop."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        registry, profiler = self.server.registry, self.server.profiler
+        if url.path == "/metrics":
+            self._reply(registry.to_text(), "text/plain")
+        elif url.path == "/metrics.json":
+            self._reply(json.dumps(registry.snapshot(), default=str), "application/json")
+        elif url.path == "/trace":
+            self._reply(json.dumps(registry.trace_events(), default=str), "application/json")
+        elif url.path == "/profile/start":
+            profiler.thread_name = query.get("thread", [profiler.thread_name])[0]
+            profiler.interval = float(query.get("interval", [profiler.interval])[0])
+            profiler.start()
+            self._reply(f"profiling {profiler.thread_name} every {profiler.interval}s\n", "text/plain")
+        elif url.path == "/profile/stop":
+            profiler.stop()
+            self._reply(profiler.report(), "text/plain")
+        elif url.path == "/profile":
+            self._reply(profiler.report(), "text/plain")
+        else:
+            self.send_error(404)
+
+    def _reply(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(registry=None, profiler=None, host=METRICS_HOST, port=METRICS_PORT):
+    """Serves the metrics endpoint from a daemon thread; returns the server (``shutdown()`` to stop)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or REGISTRY
+    server.profiler = profiler or SamplingProfiler()
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
+
+
+# Process-wide registry; modules record into it through these helpers.
+REGISTRY = Metrics()
+span = REGISTRY.span
+record = REGISTRY.record
+count = REGISTRY.count
+event = REGISTRY.event
@@ -0,0 +1,267 @@
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import speech_recognition as sr
+
+import metrics
+
+# --- Speech Front-End Configuration ---
+SPEECH_BACKEND = "google"  # "google", "sphinx" (offline, needs pocketsphinx) or "replay"
+CHUNK_SECONDS = 0.03
+PRE_ROLL_SECONDS = 0.3
+SPEECH_START_CHUNKS = 3  # Consecutive loud chunks needed to open an utterance
+END_SILENCE_SECONDS = 0.8
+MAX_UTTERANCE_SECONDS = 15
+MIN_UTTERANCE_SECONDS = 0.3
+THRESHOLD_RATIO = 3.0  # Speech must be this many times louder than the noise floor
+MIN_ENERGY_THRESHOLD = 150.0
+RECALIBRATE_SECONDS = 10.0
+CALIBRATION_SECONDS = 1.0  # Ambient noise sampled at start-up, before anything counts as speech
+NOISE_PERCENTILE = 20
+
+
+def chunk_energy(chunk):
+    """RMS energy of a chunk of 16-bit mono PCM."""
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class MicrophoneSource:
+    """Continuous 16-bit mono capture from the default microphone; the stream stays open between utterances."""
+
+    def __init__(self, device_index=None, sample_rate=16000):
+        self._microphone = sr.Microphone(device_index=device_index, sample_rate=sample_rate,
+                                         chunk_size=int(sample_rate * CHUNK_SECONDS))
+        self._source = self._microphone.__enter__()
+        self.sample_rate = self._source.SAMPLE_RATE
+        self.sample_width = self._source.SAMPLE_WIDTH
+
+    def read(self):
+        return self._source.stream.read(self._source.CHUNK)
+
+    def close(self):
+        self._microphone.__exit__(None, None, None)
+
+
+class WavFileSource:
+    """Replays a 16-bit mono WAV file chunk by chunk, optionally paced in real time, then returns b""."""
+
+    def __init__(self, path, realtime=True, trailing_silence=1.0):
+        self._wav = wave.open(path, "rb")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+        self.realtime = realtime
+        self._frames_per_chunk = int(self.sample_rate * CHUNK_SECONDS)
+        self._silence_chunks = int(trailing_silence / CHUNK_SECONDS)
+
+    def read(self):
+        chunk = self._wav.readframes(self._frames_per_chunk)
+        if not chunk and self._silence_chunks > 0:
+            # Pads the end with silence so a trailing utterance gets closed.
+            self._silence_chunks -= 1
+            chunk = b"\0" * self._frames_per_chunk * self.sample_width
+        if self.realtime and chunk:
+            time.sleep(CHUNK_SECONDS)
+        return chunk
+
+    def close(self):
+        self._wav.close()
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector with a continuously re-calibrated noise floor.
+
+    The first ``calibration_seconds`` of audio only measure the ambient noise. After
+    that the noise floor is re-estimated every ``recalibrate_seconds`` as a low
+    percentile of every chunk heard outside an utterance, so it can rise as well as
+    fall with the room. ``threshold_factor()`` can raise the bar temporarily, e.g.
+    while the assistant is talking.
+    """
+
+    def __init__(self, threshold_ratio=THRESHOLD_RATIO, min_threshold=MIN_ENERGY_THRESHOLD,
+                 recalibrate_seconds=RECALIBRATE_SECONDS, calibration_seconds=CALIBRATION_SECONDS, threshold_factor=None):
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self.recalibrate_seconds = recalibrate_seconds
+        self.threshold_factor = threshold_factor or (lambda: 1.0)
+        self.noise_floor = min_threshold / threshold_ratio
+        self._calibration_chunks = int(calibration_seconds / CHUNK_SECONDS)
+        self.calibrated = self._calibration_chunks <= 0
+        self._background = deque(maxlen=max(int(recalibrate_seconds / CHUNK_SECONDS), self._calibration_chunks))
+        self._last_calibration = time.monotonic()
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.noise_floor * self.threshold_ratio) * self.threshold_factor()
+
+    def is_speech(self, energy, in_utterance):
+        now = time.monotonic()
+        if not self.calibrated:
+            self._background.append(energy)
+            if len(self._background) >= self._calibration_chunks:
+                self._recalibrate(now)
+                self.calibrated = True
+            return False
+        if not in_utterance:
+            # Loud chunks count too: a floor learned only from chunks under the threshold could never rise above it.
+            self._background.append(energy)
+        if now - self._last_calibration >= self.recalibrate_seconds and len(self._background) > 10:
+            self._recalibrate(now)
+        return energy > self.threshold
+
+    def _recalibrate(self, now):
+        self.noise_floor = float(np.percentile(self._background, NOISE_PERCENTILE))
+        self._last_calibration = now
+
+
+class GoogleBackend:
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class SphinxBackend:
+    """Offline recognition with CMU PocketSphinx; no network round trip."""
+    name = "sphinx"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_sphinx(audio)
+
+
+class ReplayBackend:
+    """Returns scripted transcripts in order, one per utterance; stands in for a real recognizer in tests."""
+    name = "replay"
+
+    def __init__(self, transcripts, delay=0.0):
+        self._transcripts = deque(transcripts)
+        self.delay = delay
+
+    def recognize(self, audio):
+        time.sleep(self.delay)
+        if not self._transcripts:
+            raise sr.UnknownValueError()
+        return self._transcripts.popleft()
+
+
+def make_backend(name=SPEECH_BACKEND, recognizer=None, transcripts=()):
+    if name == "google":
+        return GoogleBackend(recognizer)
+    if name == "sphinx":
+        return SphinxBackend(recognizer)
+    if name == "replay":
+        return ReplayBackend(transcripts)
+    raise ValueError(f"Unknown speech backend: {name}")
+
+
+class SpeechFrontEnd:
+    """Continuous capture -> VAD utterance cutting -> background recognition.
+
+    A capture thread reads the source without pause and cuts utterances with the
+    VAD. Each finished utterance goes to a single recognition worker, so recognizing
+    utterance N overlaps with capturing utterance N+1 while transcripts stay in
+    order. ``on_speech_start()`` fires as soon as an utterance opens and
+    ``on_transcript(text)`` when its recognition completes. Utterances that end while
+    ``should_recognize()`` is false are dropped without being sent to the backend.
+    """
+
+    def __init__(self, source, backend, on_transcript, on_speech_start=None, vad=None,
+                 end_silence=END_SILENCE_SECONDS, max_utterance=MAX_UTTERANCE_SECONDS, should_recognize=None, log=print):
+        self.source = source
+        self.end_silence = end_silence
+        self.max_utterance = max_utterance
+        self.backend = backend
+        self.on_transcript = on_transcript
+        self.on_speech_start = on_speech_start
+        self.should_recognize = should_recognize or (lambda: True)
+        self.vad = vad or EnergyVAD()
+        self.log = log
+        self._recognition = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr")
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {"utterances": 0, "skipped": 0, "transcripts": 0, "no_speech": 0, "errors": 0, "recognition_seconds": 0.0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True, name="speech-capture")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        """Waits for capture to end (e.g. a replayed file ran out) and pending recognitions to finish."""
+        if self._thread:
+            self._thread.join(timeout)
+        self._recognition.shutdown(wait=True)
+
+    def _capture_loop(self):
+        chunk_seconds = CHUNK_SECONDS
+        pre_roll = deque(maxlen=int(PRE_ROLL_SECONDS / chunk_seconds))
+        utterance, loud_run, silent_run, in_utterance = [], 0, 0, False
+        try:
+            while not self._stop_event.is_set():
+                chunk = self.source.read()
+                if not chunk:
+                    break
+                speech = self.vad.is_speech(chunk_energy(chunk), in_utterance)
+                if not in_utterance:
+                    pre_roll.append(chunk)
+                    loud_run = loud_run + 1 if speech else 0
+                    if loud_run >= SPEECH_START_CHUNKS:
+                        in_utterance, silent_run = True, 0
+                        utterance = list(pre_roll)
+                        pre_roll.clear()
+                        if self.on_speech_start:
+                            self.on_speech_start()
+                    continue
+
+                utterance.append(chunk)
+                silent_run = 0 if speech else silent_run + 1
+                duration = len(utterance) * chunk_seconds
+                if silent_run * chunk_seconds >= self.end_silence or duration >= self.max_utterance:
+                    if duration >= MIN_UTTERANCE_SECONDS:
+                        if self.should_recognize():
+                            self._submit(b"".join(utterance))
+                        else:
+                            self.stats["skipped"] += 1  # Nobody to talk to; never uploaded
+                    utterance, loud_run, in_utterance = [], 0, False
+        except Exception as e:
+            self.log(f"❌ Audio capture error: {e}")
+        finally:
+            self.source.close()
+
+    def _submit(self, frame_data):
+        self.stats["utterances"] += 1
+        audio = sr.AudioData(frame_data, self.source.sample_rate, self.source.sample_width)
+        self._recognition.submit(self._recognize, audio)
+
+    def _recognize(self, audio):
+        start = time.perf_counter()
+        try:
+            text = self.backend.recognize(audio)
+        except sr.UnknownValueError:
+            self.stats["no_speech"] += 1
+            return
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.log(f"❌ Speech recognition error ({self.backend.name}): {e}")
+            return
+        finally:
+            self.stats["recognition_seconds"] += time.perf_counter() - start
+            metrics.record("asr", time.perf_counter() - start, start, backend=self.backend.name)
+        self.stats["transcripts"] += 1
+        try:
+            self.on_transcript(text)
+        except Exception as e:
+            self.log(f"❌ Transcript handler error: {e}")
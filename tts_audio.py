@@ -0,0 +1,218 @@
+import hashlib
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+import metrics
+
+# --- TTS Audio Configuration ---
+AUDIO_DIR = os.path.join("cache", "audio")
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+class TTSRenderer:
+    """Renders text to audio files with pyttsx3's save-to-file path.
+
+    pyttsx3 hands out one shared engine per driver, so every use of it (speaking
+    or rendering) must hold ``lock``. Without an ``engine`` one is created on first
+    use (or by ``warm_up()``), keeping pyttsx3's import and driver start-up off the
+    caller's thread.
+    """
+
+    def __init__(self, engine=None, lock=None, audio_dir=AUDIO_DIR):
+        self._engine = engine
+        self.lock = lock or threading.Lock()
+        self.audio_dir = audio_dir
+
+    @property
+    def engine(self):
+        # Callers hold self.lock.
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+        return self._engine
+
+    def warm_up(self):
+        with self.lock:
+            return self.engine
+
+    @property
+    def voice_key(self):
+        """Identifies the current voice settings; part of every cache key."""
+        with self.lock:
+            return f"{self.engine.getProperty('voice')}|{self.engine.getProperty('rate')}|{self.engine.getProperty('volume')}"
+
+    def render(self, text, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.wav"
+        with self.lock:
+            self.engine.save_to_file(text, tmp_path)
+            self.engine.runAndWait()
+        if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+            raise RuntimeError(f"TTS engine produced no audio for {text!r}")
+        os.replace(tmp_path, path)
+        return path
+
+
+class TTSCache:
+    """Content-addressed on-disk cache of rendered speech, keyed by text + voice + rate.
+
+    Files are named by a hash of the key, so identical sentences are synthesized
+    once. Least-recently-used files are evicted when the directory exceeds
+    ``max_bytes``.
+    """
+
+    def __init__(self, renderer, audio_dir=AUDIO_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES, log=print):
+        self.renderer = renderer
+        self.audio_dir = audio_dir
+        self.max_bytes = max_bytes
+        self.log = log
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "synth_seconds": 0.0, "last_synth_seconds": 0.0, "evictions": 0}
+
+    def path_for(self, text):
+        digest = hashlib.sha256(f"{self.renderer.voice_key}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.audio_dir, f"{digest[:32]}.wav")
+
+    def get(self, text):
+        """Returns the path of the rendered audio for text, synthesizing it on a miss."""
+        path = self.path_for(text)
+        if os.path.exists(path):
+            os.utime(path)  # Marks the file recently used for eviction.
+            with self._lock:
+                self.stats["hits"] += 1
+            metrics.count("tts_cache_hits")
+            return path
+
+        start = time.perf_counter()
+        self.renderer.render(text, path)
+        elapsed = time.perf_counter() - start
+        metrics.record("tts_synth", elapsed, start, chars=len(text))
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["synth_seconds"] += elapsed
+            self.stats["last_synth_seconds"] = elapsed
+        self._evict()
+        return path
+
+    def _evict(self):
+        try:
+            files = [os.path.join(self.audio_dir, name) for name in os.listdir(self.audio_dir) if name.endswith(".wav")]
+            stats = sorted(((os.stat(path), path) for path in files), key=lambda item: item[0].st_mtime)
+        except OSError:
+            return
+        total = sum(stat.st_size for stat, _ in stats)
+        for stat, path in stats:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+            with self._lock:
+                self.stats["evictions"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["mean_synth_seconds"] = stats["synth_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        return stats
+
+
+def player_command(path):
+    """Command line that plays an audio file with the platform's stock player."""
+    if sys.platform == "darwin":
+        return ["afplay", path]
+    return ["aplay", "-q", path]
+
+
+def wav_duration(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+class AudioPlayer:
+    """Dedicated playback thread: ``play()`` queues a file and returns immediately, ``stop()`` cuts it off.
+
+    ``stop()`` ends the current file mid-utterance and drops anything queued, which
+    is what lets a visitor barge in while the assistant is talking.
+    """
+
+    def __init__(self, log=print):
+        self.log = log
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._in_flight = 0  # Queued plus playing; the player is idle only when this is zero
+        self._generation = 0
+        threading.Thread(target=self._run, daemon=True, name="audio-player").start()
+
+    @property
+    def is_playing(self):
+        return not self._idle.is_set()
+
+    def play(self, path, **tags):
+        """Queues a file; tags (e.g. turn) are attached to its playback span."""
+        with self._lock:
+            self._in_flight += 1
+            self._idle.clear()
+            self._queue.put((self._generation, path, tags))
+
+    def stop(self):
+        with self._lock:
+            self._generation += 1
+            self._stop_event.set()
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued has played or been stopped."""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            generation, path, tags = self._queue.get()
+            with self._lock:
+                # Checked and cleared together, so a stop() in between can't be lost or skip its reset.
+                current = generation == self._generation
+                if current:
+                    self._stop_event.clear()
+            if current:
+                try:
+                    with metrics.span("playback", **tags):
+                        self._play(path)
+                except Exception as e:
+                    self.log(f"❌ Audio playback error: {e}")
+            with self._lock:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.set()
+
+    def _play(self, path):
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            if self._stop_event.wait(wav_duration(path)):
+                winsound.PlaySound(None, 0)
+            return
+        process = subprocess.Popen(player_command(path))
+        while process.poll() is None:
+            if self._stop_event.wait(0.02):
+                process.terminate()
+                process.wait()
+                return
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import metrics
+from detection_scheduler import DetectionScheduler
+from emotion_service import EmotionService, crop_face
+from face_matcher import FaceMatcher
+from face_tracker import FaceTracker
+
+# --- Pipeline Configuration ---
+CAMERA_INDEX = 0
+CAPTURE_RETRY_DELAY = 1.0
+
+Frame = namedtuple("Frame", ["frame_id", "timestamp", "image"])
+FaceResult = namedtuple("FaceResult", ["track_id", "box", "name", "distance", "emotion"])
+VisionResult = namedtuple("VisionResult", ["frame_id", "timestamp", "faces", "lost_tracks", "inference_time", "camera"],
+                          defaults=(CAMERA_INDEX,))
+
+
+class LatestFrameBuffer:
+    """Single-slot buffer holding only the newest item; stale items are overwritten, not queued."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self.dropped = 0
+        self._consumed_seq = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None and self._consumed_seq < self._seq:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._condition.notify_all()
+
+    def peek(self):
+        """Returns the newest item without consuming it (None if nothing yet)."""
+        with self._condition:
+            return self._item
+
+    def get(self, last_seq=0, timeout=None):
+        """Blocks until an item newer than last_seq exists. Returns (seq, item) or (last_seq, None) on timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > last_seq, timeout=timeout):
+                return last_seq, None
+            self._consumed_seq = self._seq
+            return self._seq, self._item
+
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a camera as fast as it delivers them into a LatestFrameBuffer."""
+
+    def __init__(self, buffer, camera_index=CAMERA_INDEX, log=print):
+        super().__init__(daemon=True, name=f"capture-{camera_index}")
+        self.buffer = buffer
+        self.camera_index = camera_index
+        self.log = log
+        self.cap = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        frame_id = 0
+        while not self._stop_event.is_set():
+            if not self.cap or not self.cap.isOpened():
+                self.cap = cv2.VideoCapture(self.camera_index)
+                if not self.cap.isOpened():
+                    self.log("❌ Cannot access webcam")
+                    self._stop_event.wait(CAPTURE_RETRY_DELAY)
+                    continue
+            with metrics.span("capture", camera=self.camera_index):
+                ret, image = self.cap.read()
+            if not ret:
+                self._stop_event.wait(0.01)
+                continue
+            frame_id += 1
+            self.buffer.put(Frame(frame_id, time.time(), image))
+        if self.cap:
+            self.cap.release()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def warm_up_face_models(size=(160, 120)):
+    """Imports face_recognition (loading dlib's models) and runs detection and encoding once on a blank frame.
+
+    Returns the seconds it took; meant to run in the background at startup.
+    """
+    start = time.perf_counter()
+    import face_recognition
+
+    blank = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    face_recognition.face_locations(blank)
+    face_recognition.face_encodings(blank, [(10, size[0] - 10, size[1] - 10, 10)])
+    elapsed = time.perf_counter() - start
+    metrics.record("face_models_warm_up", elapsed, start)
+    return elapsed
+
+
+class FaceAnalyzer:
+    """Detects and tracks faces in a BGR frame, identifying and reading emotions per track.
+
+    The DetectionScheduler picks full-frame scans or ROI searches around tracked faces.
+    Encoding + matching only run when a track is born, every IDENTITY_REFRESH_FRAMES
+    frames or when its match confidence is low. Face crops go to the EmotionService
+    every EMOTION_REFRESH_FRAMES frames; if the service's worker isn't running, the
+    batch is inferred inline. ``stage_times`` holds the last frame's seconds per stage;
+    each stage is also recorded as a metrics span.
+    """
+
+    def __init__(self, matcher=None, tracker=None, emotion_service=None, scheduler=None):
+        self.matcher = matcher or FaceMatcher([], [])
+        self.tracker = tracker or FaceTracker()
+        self.emotion_service = emotion_service or EmotionService()
+        self.scheduler = scheduler or DetectionScheduler()
+        self.enrolling = False
+        self._identified_with = None
+        self.stage_times = {}
+
+    def analyze(self, frame):
+        """Returns (faces, lost_track_ids) for one frame."""
+        import face_recognition
+
+        start = time.perf_counter()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        tracked_boxes = [track.box for track in self.tracker.tracks.values()]
+        face_locations = self.scheduler.detect(rgb_frame, tracked_boxes, face_recognition.face_locations)
+        tracks, _, lost = self.tracker.update(face_locations)
+        detected = time.perf_counter()
+        for track_id in lost:
+            self.emotion_service.forget(track_id)
+
+        matcher = self.matcher
+        if matcher is not self._identified_with and not self.enrolling:
+            # The gallery changed; every track gets re-identified against the new one.
+            for track in tracks:
+                track.reset_identity()
+            self._identified_with = matcher
+
+        pending = []
+        if not self.enrolling:
+            pending = [track for track in tracks if track.needs_identity(threshold=matcher.threshold)]
+        encoded = matched = detected
+        if pending:
+            face_encodings = face_recognition.face_encodings(rgb_frame, [track.box for track in pending])
+            encoded = time.perf_counter()
+            for track, face_match in zip(pending, matcher.identify(face_encodings)):
+                track.set_identity(face_match.name, face_match.distance)
+            matched = time.perf_counter()
+        identified = time.perf_counter()
+
+        emotion_tracks = []
+        for track in tracks:
+            if track.needs_emotion():
+                self.emotion_service.submit(track.track_id, crop_face(frame, track.box).copy())
+                track.emotion_requested()
+                emotion_tracks.append(track.track_id)
+        if not self.emotion_service.running:
+            self.emotion_service.process_pending()
+
+        faces = []
+        for track in tracks:
+            track.emotion = self.emotion_service.dominant(track.track_id) or track.emotion
+            name = "enrolling" if self.enrolling else track.label
+            faces.append(FaceResult(track.track_id, track.box, name, track.distance, track.emotion))
+        end = time.perf_counter()
+        self.stage_times = {"detect": detected - start, "encode": encoded - detected, "match": matched - encoded,
+                            "emotion": end - identified}
+        pending_ids = [track.track_id for track in pending]
+        metrics.record("detect", detected - start, start, faces=len(face_locations), scale=self.scheduler.scale)
+        if pending:
+            metrics.record("encode", encoded - detected, detected, tracks=pending_ids)
+            metrics.record("match", matched - encoded, encoded, tracks=pending_ids)
+        metrics.record("emotion", end - identified, identified, tracks=emotion_tracks)
+        metrics.record("analyze", end - start, start, tracks=[track.track_id for track in tracks])
+        self.scheduler.record_frame_time(end - start)
+        return faces, lost
+
+
+class InferenceWorker(threading.Thread):
+    """Consumes the newest captured frame, runs the analyzer and publishes the result.
+
+    Frames that arrive while inference is busy are skipped rather than queued, so
+    results always describe (close to) the current scene.
+    """
+
+    def __init__(self, buffer, analyzer, on_result=None, log=print, camera_index=CAMERA_INDEX):
+        super().__init__(daemon=True, name=f"inference-{camera_index}")
+        self.buffer = buffer
+        self.camera_index = camera_index
+        self.analyzer = analyzer
+        self.on_result = on_result
+        self.log = log
+        self.latest_result = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_seq = 0
+        while not self._stop_event.is_set():
+            last_seq, frame = self.buffer.get(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            try:
+                faces, lost_tracks = self.analyzer.analyze(frame.image)
+            except Exception as e:
+                self.log(f"❌ Vision inference error: {e}")
+                continue
+            result = VisionResult(frame.frame_id, frame.timestamp, faces, lost_tracks, time.perf_counter() - start,
+                                  self.camera_index)
+            self.latest_result = result
+            if self.on_result:
+                self.on_result(result)
+
+    def stop(self):
+        self._stop_event.set()